@@ -0,0 +1,205 @@
+# This script generates synthetic distances.csv and packages.csv files and times
+# each phase of the simulator on them at a range of sizes. The results are
+# written as JSON so they can be compared between versions of the program
+
+import argparse
+import csv
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import main
+
+# These are the default settings used when generating data and running the
+# benchmarks. Routes are capped in length, since a single route through every
+# package stops being realistic long before the largest sizes
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+DEFAULT_MAX_ADDRESSES = 2000
+DEFAULT_MAX_ROUTE = 1000
+DEFAULT_PACKAGES_PER_TRUCK = 200
+
+# This function generates a distances.csv file with the provided number of
+# addresses, including the hub. Addresses are placed at random points in a
+# square area, and the distances between them are the straight line distances
+# rounded to one decimal place. Like the real file, only the lower triangle of
+# the table is filled in. It returns the list of addresses
+# Big O: O(n^2)
+def generate_distance_csv(path, num_addresses, rng, area_size=20):
+    addresses = ["HUB"] + [f"{number} Synthetic St" for number in range(1, num_addresses)]
+    points = [(rng.random()*area_size, rng.random()*area_size) for _ in addresses]
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([""] + addresses)
+
+        for y, (address, (y_x, y_y)) in enumerate(zip(addresses, points)):
+            distances = [f"{math.hypot(y_x - x_x, y_y - x_y):.1f}" for x_x, x_y in points[:y + 1]]
+            writer.writerow([address] + distances + [""]*(num_addresses - y - 1))
+
+    return addresses
+
+# This function generates a packages.csv file with the provided number of
+# packages, each sent to a random address other than the hub.
+#   - deadline_density is the fraction of packages with a deadline before the
+#     end of the day. Deadlines fall between 9:00AM and 12:00PM
+#   - delayed_fraction is the fraction of packages that arrive at the hub after
+#     the start of the day, spread evenly over the first arrival_spread hours
+# Big O: O(n)
+def generate_package_csv(path, num_packages, addresses, rng, deadline_density=0.2, delayed_fraction=0.1, arrival_spread=2):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Package ID", "Address", "City", "State", "Zip", "Delivery Deadline", "Mass KILO", "Arrival Time", "Special Notes"])
+
+        for pkg_id in range(1, num_packages + 1):
+            deadline = "EOD"
+            if rng.random() < deadline_density:
+                deadline = format_clock_time(rng.randrange(60, 240, 15))
+
+            arrival_time = "BOD"
+            if arrival_spread > 0 and rng.random() < delayed_fraction:
+                arrival_time = format_clock_time(rng.randrange(1, int(arrival_spread*60) + 1))
+
+            address = addresses[rng.randrange(1, len(addresses))]
+            writer.writerow([pkg_id, address, "Salt Lake City", "UT", "84100", deadline, rng.randint(1, 50), arrival_time, ""])
+
+# This function takes a number of minutes after 8:00AM and returns it in the
+# format used by the packages.csv file. Example: 150 -> 10:30 AM
+# Big O: O(1)
+def format_clock_time(minutes):
+    hours, minutes = divmod(8*60 + minutes, 60)
+    suffix = "AM" if hours < 12 else "PM"
+    return f"{hours % 12 or 12}:{minutes:02d} {suffix}"
+
+# This function runs a function the provided number of times and returns the
+# shortest time it took, in seconds, along with the result of the last run
+# Big O: O(r) for r repeats
+def time_phase(function, repeats):
+    best_time = math.inf
+    result = None
+
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = function()
+        best_time = min(best_time, time.perf_counter() - start_time)
+
+    return best_time, result
+
+# This function generates the data files for a single size and times each
+# phase of the simulator on them. It returns a list of result dictionaries, one
+# per phase
+# Big O: O(n^2) for n packages
+def run_size(num_packages, args, data_dir):
+    rng = random.Random(args.seed + num_packages)
+    num_addresses = max(2, min(num_packages, args.max_addresses))
+
+    distances_path = os.path.join(data_dir, f"distances_{num_packages}.csv")
+    packages_path = os.path.join(data_dir, f"packages_{num_packages}.csv")
+    addresses = generate_distance_csv(distances_path, num_addresses, rng)
+    generate_package_csv(packages_path, num_packages, addresses, rng, args.deadline_density, args.delayed_fraction, args.arrival_spread)
+
+    results = []
+
+    def record(phase, seconds, **details):
+        results.append({"size": num_packages, "addresses": num_addresses, "phase": phase, "seconds": seconds, **details})
+        print(f"{num_packages:>8} {phase:<24} {seconds:10.4f}s", file=sys.stderr)
+
+    seconds, distance_table = time_phase(lambda: main.create_distance_hashtable(main.load_distance_data(distances_path)), args.repeats)
+    record("load_distances", seconds)
+
+    seconds, package_table = time_phase(lambda: main.create_package_hashtable(main.load_package_data(packages_path), distance_table), args.repeats)
+    record("create_package_hashtable", seconds)
+
+    # The nearest neighbor lists are normally built as routes need them, so
+    # they're built up front here to keep them out of the route timings
+    seconds, _ = time_phase(distance_table.build_neighbor_index, 1)
+    record("build_neighbor_index", seconds)
+
+    # A single route through the first max_route packages
+    route_packages = list(range(1, min(num_packages, args.max_route) + 1))
+    simulator = main.Simulator()
+
+    seconds, _ = time_phase(lambda: simulator.calculate_delivery_route(package_table, distance_table, route_packages), args.repeats)
+    record("calculate_delivery_route", seconds, route_size=len(route_packages))
+
+    seconds, _ = time_phase(lambda: simulator.simulate_delivery("Truck A", package_table, distance_table, route_packages, 0, 4), args.repeats)
+    record("simulate_delivery", seconds, route_size=len(route_packages))
+
+    # Deadline checks on many small candidate loads, like an assignment search
+    # would make. Some are rejected before a route is built, the rest stop at
+    # their first late package
+    candidates = [(rng.sample(range(1, num_packages + 1), min(num_packages, main.TRUCK_CAPACITY)), rng.choice([0, 1, 2])) for _ in range(args.candidates)]
+    seconds, _ = time_phase(lambda: [simulator.find_late_package(package_table, distance_table, package_list, departure_time) for package_list, departure_time in candidates], args.repeats)
+    record("find_late_package", seconds, candidates=len(candidates))
+
+    # A full day with enough trucks and drivers for the number of packages
+    num_trucks = max(main.NUM_TRUCKS, math.ceil(num_packages/args.packages_per_truck))
+
+    def full_simulation():
+        day_timeline = main.create_day_timeline(package_table, distance_table, None, num_trucks, num_trucks)
+        return main.run_simulation(package_table, distance_table, 4, day_timeline), day_timeline
+
+    seconds, (_, day_timeline) = time_phase(full_simulation, args.repeats)
+    record("run_simulation", seconds, trucks=num_trucks)
+
+    # The state of the day every five minutes from 8:00AM to 5:00PM, using the
+    # routes planned above
+    replay_times = [minutes/60 for minutes in range(0, 9*60 + 1, 5)]
+    seconds, _ = time_phase(lambda: main.run_replay(package_table, distance_table, replay_times, day_timeline), args.repeats)
+    record("run_replay", seconds, times=len(replay_times))
+
+    return results
+
+# This function reads the command line arguments the benchmark was started with
+# Big O: O(1)
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmark the delivery simulator on synthetic data")
+    parser.add_argument("--sizes", type=main.parse_number_list, default=DEFAULT_SIZES, metavar="LIST", help="comma separated package counts to benchmark")
+    parser.add_argument("--max-addresses", type=int, default=DEFAULT_MAX_ADDRESSES, help="largest number of addresses to generate")
+    parser.add_argument("--max-route", type=int, default=DEFAULT_MAX_ROUTE, help="largest number of packages in the single route benchmarks")
+    parser.add_argument("--packages-per-truck", type=int, default=DEFAULT_PACKAGES_PER_TRUCK, help="packages per truck in the full simulation")
+    parser.add_argument("--candidates", type=int, default=1000, help="number of candidate loads in the deadline check benchmark")
+    parser.add_argument("--deadline-density", type=float, default=0.2, help="fraction of packages with a deadline")
+    parser.add_argument("--delayed-fraction", type=float, default=0.1, help="fraction of packages that arrive after the start of the day")
+    parser.add_argument("--arrival-spread", type=float, default=2, help="hours over which delayed packages arrive")
+    parser.add_argument("--repeats", type=int, default=1, help="number of times each phase is run, the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="random seed used to generate the data")
+    parser.add_argument("--data-dir", default=None, help="keep the generated csv files in this directory")
+    parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+# This function generates the data for each size, runs the benchmarks, and
+# writes out the results
+# Big O: O(n^2) for the largest size n
+def main_benchmark():
+    args = parse_arguments()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = args.data_dir or temp_dir
+        os.makedirs(data_dir, exist_ok=True)
+
+        results = []
+        for num_packages in args.sizes:
+            results.extend(run_size(int(num_packages), args, data_dir))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "data_dir")},
+        "results": results,
+    }
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,272 +1,2575 @@
 # Stephen Center ID#001168251
 
+import argparse
+import array
+import asyncio
+import atexit
+import bisect
+import concurrent.futures
+import contextlib
 import csv
 import datetime
+import hashlib
+import heapq
+import http
+import io
+import itertools
+import json
 import math
+import mmap
+import operator
+import os
+import re
+import struct
+import sys
+import time
+import urllib.parse
+from multiprocessing import shared_memory
+
+# This is the speed of the trucks in miles/hour
+TRUCK_SPEED = 18
+
+# This is the number of hours after 8:00AM that the day ends, which is used as
+# the deadline for packages that only need to be delivered by the end of the day
+END_OF_DAY = 16
+
+# These are the default size of the fleet and the number of packages each
+# truck can carry on a single trip
+NUM_TRUCKS = 3
+NUM_DRIVERS = 2
+TRUCK_CAPACITY = 16
+
+# When planning a route, a package this many miles or fewer from the truck is
+# delivered next even if other packages have earlier deadlines
+CLOSE_DISTANCE = 1
+
+# This is the number of packages read from the packages file at a time
+PACKAGE_CHUNK_SIZE = 10000
+
+# This is the file that parsed tables are saved to, so they can be loaded
+# quickly the next time the program starts. The header holds a marker
+# identifying the file, the length of the metadata and where the matrix starts
+SNAPSHOT_PATH = "tables.snapshot"
+SNAPSHOT_MAGIC = b"WGUSNAP4"
+SNAPSHOT_HEADER = struct.Struct("<8sQQ")
+
+# This is the file that the instrumentation report is written to, unless
+# another one is provided
+INSTRUMENTATION_PATH = "instrumentation.json"
+
+# These are the names used for each delivery status ID in machine-readable
+# output, and the columns used when that output is written as csv. Exported
+# records are written out this many at a time
+DELIVERY_STATUS_NAMES = ("at_hub", "in_transit", "delivered")
+EXPORT_FIELDS = ["record", "time", "package", "name", "status", "carrier", "delivery_time", "deadline", "late",
+                 "miles_traveled", "miles_required", "route_length", "packages_delivered", "packages_total"]
+EXPORT_CHUNK_SIZE = 10000
+
+# These are the kinds of events handled by LoadPlanner.schedule_loads()
+LOAD_READY = 0
+TRIP_RETURN = 1
+
+# This is the number of routes kept by the route cache
+ROUTE_CACHE_SIZE = 1024
+
+# This is the default number of seconds spent moving packages between loads
+# after they're planned
+LOAD_SEARCH_TIME = 1.0
+
+# Every change to a HashTable or DistanceTable gives it a new version stamp
+# from this counter, so two tables never share a stamp and a stamp that's been
+# seen before means the table hasn't changed since
+VERSION_STAMPS = itertools.count(1)
+
+# This object marks an unused slot in a HashTable. A dedicated object is used
+# rather than None so that None can still be stored as a key
+EMPTY_SLOT = object()
 
 # The HashTable class is used to store the package objects, as well as the
-# distances between addresses
+# address IDs used by the distance table. It uses open addressing with linear
+# probing, storing keys and values in two flat parallel lists rather than
+# a list of buckets
 class HashTable:
+    __slots__ = ("size", "num_items", "key_list", "value_list", "version")
+    
+    # The table grows once it is more than 2/3 full, and only shrinks once it
+    # drops below 1/8 full. The gap between the two thresholds means that
+    # alternating inserts and deletes can never cause repeated resizing
+    MIN_SIZE = 8
+    
     def __init__(self, initial_size):
         # An initial size for the HashTable is set so we don't have to
         # continually resize as we initially populate the table
-        self.size = 2**math.ceil(math.log2(max(1, initial_size)))
+        self.size = self.get_size_for(initial_size)
         self.num_items = 0
-        self.bucket_list = [[] for _ in range(self.size)]
+        self.key_list = [EMPTY_SLOT]*self.size
+        self.value_list = [None]*self.size
+        self.version = next(VERSION_STAMPS)
+        
+    # This method returns the smallest power of 2 that can hold the provided
+    # number of items without going over the grow threshold
+    # Big O: O(1)
+    @classmethod
+    def get_size_for(cls, num_items):
+        return max(cls.MIN_SIZE, 2**math.ceil(math.log2(max(1, num_items*3//2 + 1))))
+        
+    # This method returns the slot that the provided key is stored in, or the
+    # empty slot where it would be stored if it isn't in the table
+    # Big O: O(1) to O(n)
+    def find_slot(self, key):
+        mask = self.size - 1
+        key_list = self.key_list
+        index = hash(key) & mask
+        
+        while True:
+            slot_key = key_list[index]
+            if slot_key is EMPTY_SLOT or slot_key == key:
+                return index
+            index = (index + 1) & mask
         
     # This method returns true if the table has a value for the provided key, 
     # false otherwise
     # Big O: O(1) to O(n)
     def has_key(self, key):
-        hashed_key = hash(key) % self.size
-        bucket = self.bucket_list[hashed_key]
-        
-        for kvp in enumerate(bucket):
-            if kvp[0] == key:
-                return True
-                
-        return False
+        return self.key_list[self.find_slot(key)] is not EMPTY_SLOT
         
     # This method inserts a new key-value pair into the hash table
-    # Big O: O(1) to O(n), O(n^2) if resizing
+    # Big O: O(1) to O(n), O(n) if resizing
     def insert_val(self, key, value):
-        hashed_key = hash(key) % self.size
+        index = self.find_slot(key)
+        self.version = next(VERSION_STAMPS)
         
         # If the provided key already exists in the hash table then we'll
         # overwrite its value with the new value
-        for index, kvp in enumerate(self.bucket_list[hashed_key]):
-            if kvp[0] == key:
-                self.bucket_list[hashed_key][index] = (key, value)
-                return
+        if self.key_list[index] is not EMPTY_SLOT:
+            self.value_list[index] = value
+            return
             
         self.num_items += 1
+        self.key_list[index] = key
+        self.value_list[index] = value
         
-        if self.num_items > self.size:
-            self.resize()
-            hashed_key = hash(key) % self.size
+        if self.num_items*3 > self.size*2:
+            self.resize(self.get_size_for(self.num_items))
+            
+    # This method inserts many key-value pairs at once. The table is resized a
+    # single time up front to fit all of the new items, so no resizing happens
+    # while they are inserted
+    # Big O: O(n)
+    def bulk_insert(self, pairs):
+        pairs = pairs if isinstance(pairs, (list, tuple)) else list(pairs)
         
-        self.bucket_list[hashed_key].append((key, value))
+        new_size = self.get_size_for(self.num_items + len(pairs))
+        if new_size > self.size:
+            self.resize(new_size)
+            
+        self.version = next(VERSION_STAMPS)
+        key_list = self.key_list
+        value_list = self.value_list
+        for key, value in pairs:
+            index = self.find_slot(key)
+            if key_list[index] is EMPTY_SLOT:
+                self.num_items += 1
+                key_list[index] = key
+            value_list[index] = value
         
     # This method returns the value corresponding to the provided key
     # Big O: O(1) to O(n)
     def get_val(self, key):
-        hashed_key = hash(key) % self.size
-        bucket = self.bucket_list[hashed_key]
-       
-        for kvp in bucket:
-            if kvp[0] == key:
-                return kvp[1];
-                
-        raise KeyError(f"Key '{key}' not found in HashTable")
+        index = self.find_slot(key)
         
-    # This method deletes the key-value pair with the matching key
-    # Big O: O(1) to O(n), O(n^2) if resizing
+        if self.key_list[index] is EMPTY_SLOT:
+            raise KeyError(f"Key '{key}' not found in HashTable")
+            
+        return self.value_list[index]
+        
+    # This method deletes the key-value pair with the matching key. Rather than
+    # leaving a marker behind, any items further along the probe sequence that
+    # would no longer be reachable are shifted back into the freed slot
+    # Big O: O(1) to O(n), O(n) if resizing
     def delete_val(self, key):
-        if not self.has_key(key):
+        index = self.find_slot(key)
+        
+        if self.key_list[index] is EMPTY_SLOT:
             raise KeyError(f"Key '{key}' not found in HashTable")
+            
+        self.version = next(VERSION_STAMPS)
+        mask = self.size - 1
+        key_list = self.key_list
+        value_list = self.value_list
         
-        hashed_key = hash(key) % self.size        
-        bucket = self.bucket_list[hashed_key]
-        self.bucket_list[hashed_key] = [kvp for kvp in bucket if kvp[0] != key]
+        next_index = index
+        while True:
+            next_index = (next_index + 1) & mask
+            next_key = key_list[next_index]
+            if next_key is EMPTY_SLOT:
+                break
+                
+            # An item can only be moved into the freed slot if its home slot
+            # isn't between the freed slot and its current slot
+            home = hash(next_key) & mask
+            if (next_index - home) & mask >= (next_index - index) & mask:
+                key_list[index] = next_key
+                value_list[index] = value_list[next_index]
+                index = next_index
+                
+        key_list[index] = EMPTY_SLOT
+        value_list[index] = None
             
         self.num_items -= 1
-        if self.num_items < self.size/2:
-            self.resize()
+        if self.num_items*8 < self.size and self.size > self.MIN_SIZE:
+            self.resize(self.get_size_for(self.num_items))
         
     # This method is called when it's necessary to resize the hash table.
-    # It sets the number of buckets equal to the smallest power of 2 larger
-    # than the number of items in the table
-    # Big O: O(n^2)
-    def resize(self):
-        # Calculate the smallest power of 2 that is larger than the
-        # number of items in the table (e.g. 16 for 13 items, 8 for 7 items etc)
-        self.size = 2**math.ceil(math.log2(self.num_items))
-        
-        # Create a new list of buckets
-        new_buckets = [[] for _ in range(self.size)]
-        
-        # Assign new hashes to each of the items in the old bucket list
-        for bucket in self.bucket_list:
-            for kvp in bucket:
-                hashed_key = hash(kvp[0]) % self.size
-                new_buckets[hashed_key].append(kvp)
-                
-        # Replace the old bucket list with the new resized one
-        self.bucket_list = new_buckets
-   
+    # It moves every item into a new set of slots of the provided size
+    # Big O: O(n)
+    def resize(self, new_size):
+        old_keys = self.key_list
+        old_values = self.value_list
+        
+        self.size = new_size
+        self.key_list = [EMPTY_SLOT]*new_size
+        self.value_list = [None]*new_size
+        
+        # Assign new slots to each of the items in the old lists. We know
+        # none of the keys are duplicates, so we only need to find an empty slot
+        mask = new_size - 1
+        key_list = self.key_list
+        for key, value in zip(old_keys, old_values):
+            if key is EMPTY_SLOT:
+                continue
+                
+            index = hash(key) & mask
+            while key_list[index] is not EMPTY_SLOT:
+                index = (index + 1) & mask
+                
+            key_list[index] = key
+            self.value_list[index] = value
+            
+    # This method returns the number of items in the table
+    # Big O: O(1)
+    def __len__(self):
+        return self.num_items
+        
+    # These methods allow a HashTable to be pickled so it can be sent to other
+    # processes. The empty slot marker can't be pickled, so only the key-value
+    # pairs are saved and the table is rebuilt from them
+    # Big O: O(n)
+    def __getstate__(self):
+        return list(self.items())
+        
+    def __setstate__(self, pairs):
+        HashTable.__init__(self, len(pairs))
+        self.bulk_insert(pairs)
+        
+    # These methods allow the keys, values, or key-value pairs in the table to be
+    # iterated over. Items are produced in slot order, not insertion order
+    # Big O: O(n)
+    def __iter__(self):
+        return self.keys()
+        
+    def keys(self):
+        return (key for key in self.key_list if key is not EMPTY_SLOT)
+        
+    def values(self):
+        return (value for key, value in zip(self.key_list, self.value_list) if key is not EMPTY_SLOT)
+        
+    def items(self):
+        return ((key, value) for key, value in zip(self.key_list, self.value_list) if key is not EMPTY_SLOT)
+
+# The DistanceTable class stores the distance between every pair of addresses.
+# Each address is interned to an integer ID when the table is created, and the
+# distances are stored in a single flat array, so looking up a distance is one
+# index operation instead of two hash table lookups. Like the distances.csv
+# file, only the lower triangle of the table is stored, since the distance from
+# A to B is the same as the distance from B to A. The distances can be stored as
+# doubles (typecode "d") or as floats (typecode "f") to halve the memory used
+class DistanceTable:
+    # The number of closest addresses kept for each address by get_nearest_addresses()
+    NEIGHBOR_COUNT = 32
+    
+    def __init__(self, addresses, matrix=None, typecode="d", matrix_path=None):
+        # The list of addresses doubles as our ID -> address lookup, while the
+        # address_ids hash table is used for address -> ID lookups
+        self.addresses = list(addresses)
+        self.num_addresses = len(self.addresses)
+        self.address_ids = HashTable(self.num_addresses)
+        self.address_ids.bulk_insert((address, address_id) for address_id, address in enumerate(self.addresses))
+
+        # Row A of the lower triangle holds the distances from address A to
+        # every address with an ID less than or equal to A, and starts at index
+        # A*(A + 1)/2. So the distance between addresses A and B, where A >= B,
+        # is located at index row_starts[A] + B
+        self.row_starts = [address_id*(address_id + 1)//2 for address_id in range(self.num_addresses)]
+        self.typecode = typecode
+        
+        # An existing matrix can be provided, such as one held in shared memory
+        # or a snapshot. If matrix_path is provided instead, the new matrix is
+        # kept in that file and memory-mapped, so other processes can share it
+        if matrix is None:
+            matrix = create_matrix(get_triangle_size(self.num_addresses), typecode, matrix_path)
+            
+        self.matrix = matrix
+        self.nearest_addresses = [None]*self.num_addresses
+        self.version = next(VERSION_STAMPS)
+        
+        # The length of the shortest path from the hub to each address, found
+        # by get_hub_distances() the first time it's needed
+        self.hub_distances = None
+        
+        # Once apply_shortest_paths() has been run, next_hops[A][B] is the
+        # address to go to next on the shortest path from address A to B
+        self.next_hops = None
+        
+        # If a SpeedProfile is set, travel times depend on the time of day.
+        # speed_classes uses the same layout as the matrix and holds the
+        # profile row used between each pair of addresses, with every pair
+        # using row 0 until it's given a class
+        self.speed_profile = None
+        self.speed_classes = None
+
+    # This method returns the integer ID assigned to the provided address
+    # Big O: O(1) to O(n)
+    def get_address_id(self, address):
+        return self.address_ids.get_val(address)
+
+    # This method returns the IDs of the addresses closest to the address with
+    # the provided ID, sorted from closest to farthest. The address itself is
+    # included, since its distance to itself is 0. Each list is computed the
+    # first time it's needed and then kept for later calls
+    # Big O: O(n log k) the first time for k neighbors, O(1) afterwards
+    def get_nearest_addresses(self, address_id):
+        nearest = self.nearest_addresses[address_id]
+        
+        if nearest is None:
+            row = self.get_row(address_id)
+            nearest = heapq.nsmallest(self.NEIGHBOR_COUNT, range(self.num_addresses), key=lambda other: (row[other], other))
+            self.nearest_addresses[address_id] = nearest
+            
+        return nearest
+        
+    # This method computes the nearest neighbor list of every address ahead of
+    # time, rather than as each one is needed
+    # Big O: O(n^2 log k) for k neighbors
+    def build_neighbor_index(self):
+        for address_id in range(self.num_addresses):
+            self.get_nearest_addresses(address_id)
+            
+    # This method returns the integer ID assigned to the hub
+    # Big O: O(1) to O(n)
+    def get_hub_id(self):
+        return self.address_ids.get_val("HUB")
+        
+    # This method returns a list of the length of the shortest path from the hub
+    # to every address, in ID order. The distances in the file don't always
+    # obey the triangle inequality, so going through another address can be
+    # shorter than the direct distance. The paths are found with Dijkstra's
+    # algorithm the first time they're needed, unless apply_shortest_paths()
+    # has already been run, and kept until a distance changes
+    # Big O: O(n^2) the first time, O(1) afterwards
+    def get_hub_distances(self):
+        if self.hub_distances is not None:
+            return self.hub_distances
+            
+        hub_distances = self.get_row(self.get_hub_id())
+        if self.next_hops is None:
+            addresses = range(self.num_addresses)
+            settled = bytearray(self.num_addresses)
+            queue = [(distance, address_id) for address_id, distance in enumerate(hub_distances)]
+            heapq.heapify(queue)
+            
+            while queue:
+                distance, address_id = heapq.heappop(queue)
+                if settled[address_id]:
+                    continue
+                    
+                settled[address_id] = 1
+                row = self.get_row(address_id)
+                for other_id in itertools.compress(addresses, map(operator.lt, map(distance.__add__, row), hub_distances)):
+                    hub_distances[other_id] = distance + row[other_id]
+                    heapq.heappush(queue, (hub_distances[other_id], other_id))
+                    
+        self.hub_distances = hub_distances
+        return hub_distances
+        
+    # This method returns a number of hours that a truck going at the provided
+    # speed can't possibly reach the address with the provided ID from the hub
+    # in less than, whatever route it takes and whenever it leaves. It's the
+    # shortest path from the hub driven at the fastest speed the SpeedProfile
+    # allows on any road at any time
+    # Big O: O(1) after get_hub_distances()
+    def get_min_travel_time(self, address_id, speed):
+        max_factor = self.speed_profile.max_factor if self.speed_profile is not None else 1
+        return self.get_hub_distances()[address_id]/(speed*max_factor)
+
+    # This method sets the distance between the addresses with the two provided
+    # IDs. Distances are the same in both directions, so only one is stored.
+    # The nearest neighbor lists of the two addresses are thrown away, since
+    # the new distance can change their order. No other list uses it
+    # Big O: O(1)
+    def set_distance(self, id_a, id_b, distance):
+        if id_a < id_b:
+            id_a, id_b = id_b, id_a
+        self.matrix[self.row_starts[id_a] + id_b] = distance
+        self.nearest_addresses[id_a] = self.nearest_addresses[id_b] = None
+        self.hub_distances = None
+        self.version = next(VERSION_STAMPS)
+        
+    # This method sets many distances at once from (ID A, ID B, distance)
+    # triples. The version only changes once, after all of them are set, and
+    # every nearest neighbor list is thrown away
+    # Big O: O(n)
+    def bulk_set_distances(self, distances):
+        matrix = self.matrix
+        row_starts = self.row_starts
+        for id_a, id_b, distance in distances:
+            if id_a < id_b:
+                id_a, id_b = id_b, id_a
+            matrix[row_starts[id_a] + id_b] = distance
+            
+        self.nearest_addresses = [None]*self.num_addresses
+        self.hub_distances = None
+        self.version = next(VERSION_STAMPS)
+
+    # This method returns the distance between the addresses with the two
+    # provided IDs
+    # Big O: O(1)
+    def get_distance(self, id_a, id_b):
+        if id_a < id_b:
+            id_a, id_b = id_b, id_a
+        return self.matrix[self.row_starts[id_a] + id_b]
+        
+    # This method sets the SpeedProfile used for travel times, or removes it if
+    # None is provided
+    # Big O: O(1)
+    def set_speed_profile(self, speed_profile):
+        self.speed_profile = speed_profile
+        self.version = next(VERSION_STAMPS)
+        
+    # This method sets the speed class used between the addresses with the two
+    # provided IDs. The classes are only stored once the first one is set
+    # Big O: O(n^2) the first time, O(1) afterwards
+    def set_speed_class(self, id_a, id_b, speed_class):
+        if self.speed_classes is None:
+            self.speed_classes = array.array("B", bytes(get_triangle_size(self.num_addresses)))
+            
+        if id_a < id_b:
+            id_a, id_b = id_b, id_a
+        self.speed_classes[self.row_starts[id_a] + id_b] = speed_class
+        self.version = next(VERSION_STAMPS)
+        
+    # This method returns the speed class used between the addresses with the
+    # two provided IDs
+    # Big O: O(1)
+    def get_speed_class(self, id_a, id_b):
+        if self.speed_classes is None:
+            return 0
+            
+        if id_a < id_b:
+            id_a, id_b = id_b, id_a
+        return self.speed_classes[self.row_starts[id_a] + id_b]
+        
+    # This method returns the number of hours it takes to drive from one
+    # address to another at the provided speed, leaving at the provided time
+    # in hours after 8:00AM. Without a SpeedProfile the time of day is ignored
+    # Big O: O(1) unless the trip crosses into another time bucket, then O(log b) for b buckets
+    def get_travel_time(self, id_a, id_b, start_time, speed):
+        distance = self.get_distance(id_a, id_b)
+        if self.speed_profile is None:
+            return distance/speed
+            
+        return self.speed_profile.get_travel_time(self.get_speed_class(id_a, id_b), start_time, distance, speed)
+        
+    # This method replaces every distance with the length of the shortest path
+    # between the two addresses, going through any of the other addresses,
+    # using the Floyd-Warshall algorithm. The distances in distances.csv don't
+    # always obey the triangle inequality, so going from A to C by way of B can
+    # be shorter than going straight there. The next address on each shortest
+    # path is recorded so that get_path() can rebuild the full path.
+    # Each row is updated with a few passes of map() and compress(), which run
+    # in C, and only the distances that improve are touched in Python. The new
+    # distances are stored in a new array, so a matrix shared with other
+    # processes or read from a snapshot is never changed
+    # Big O: O(n^3)
+    def apply_shortest_paths(self):
+        num_addresses = self.num_addresses
+        addresses = range(num_addresses)
+        rows = [self.get_row(address_id) for address_id in addresses]
+        next_hops = [array.array("l", addresses) for _ in addresses]
+        
+        for via_id in addresses:
+            via_row = rows[via_id]
+            for address_id in addresses:
+                row = rows[address_id]
+                to_via = row[via_id]
+                
+                # A path through via_id has to be shorter by more than rounding
+                # error to replace the current one
+                shorter = list(itertools.compress(addresses, map(operator.lt, map((to_via + 1e-9).__add__, via_row), row)))
+                if not shorter:
+                    continue
+                    
+                hops = next_hops[address_id]
+                first_hop = hops[via_id]
+                for other_id in shorter:
+                    row[other_id] = to_via + via_row[other_id]
+                    hops[other_id] = first_hop
+                    
+        self.matrix = array.array(self.typecode, (distance for address_id, row in enumerate(rows) for distance in row[:address_id + 1]))
+        self.next_hops = next_hops
+        self.nearest_addresses = [None]*num_addresses
+        self.hub_distances = None
+        self.version = next(VERSION_STAMPS)
+        
+    # This method returns the list of address IDs on the shortest path from one
+    # address to another, including both ends. If apply_shortest_paths() hasn't
+    # been run, the direct path is the only one known
+    # Big O: O(p) for p addresses on the path
+    def get_path(self, id_a, id_b):
+        if self.next_hops is None or id_a == id_b:
+            return [id_a] if id_a == id_b else [id_a, id_b]
+            
+        path = [id_a]
+        while id_a != id_b:
+            id_a = self.next_hops[id_a][id_b]
+            path.append(id_a)
+            
+        return path
+        
+    # This method returns a list of the distances from the address with the
+    # provided ID to every address, in ID order. The distances to lower IDs are
+    # stored together and copied in one slice, the rest are read one at a time
+    # Big O: O(n)
+    def get_row(self, address_id):
+        matrix = self.matrix
+        row_start = self.row_starts[address_id]
+        row = matrix[row_start:row_start + address_id + 1].tolist()
+        row.extend([matrix[other_start + address_id] for other_start in self.row_starts[address_id + 1:]])
+        return row
+
+# The SpeedProfile class describes how fast the trucks can drive at each time
+# of day. The day is split into buckets of equal length, and each row of the
+# profile holds a speed factor for every bucket, which the truck's speed is
+# multiplied by. Row 0 is used for every road unless the DistanceTable gives a
+# pair of addresses a different row, so rush hour can slow the highways more
+# than the side streets. Times before the first bucket use the first bucket's
+# factor and times after the last bucket use the last one's
+class SpeedProfile:
+    def __init__(self, factors, bucket_hours=1, start_time=0):
+        self.factors = [list(row) for row in factors]
+        self.bucket_hours = bucket_hours
+        self.start_time = start_time
+        self.num_buckets = len(self.factors[0]) if self.factors else 0
+        
+        if self.num_buckets == 0 or bucket_hours <= 0:
+            raise ValueError("A speed profile needs at least one time bucket")
+            
+        for row in self.factors:
+            if len(row) != self.num_buckets:
+                raise ValueError("Every row of a speed profile needs a factor for each time bucket")
+                
+            if min(row) <= 0:
+                raise ValueError("Speed factors must be greater than 0")
+                
+        # No road is ever faster than the largest factor allows
+        self.max_factor = max(max(row) for row in self.factors)
+        
+        # positions[c][b] is the number of hours it would take to drive the
+        # distance covered from start_time to the start of bucket b at the
+        # truck's normal speed. A trip's travel time is then the time it takes
+        # to get from one position to another, which is found without stepping
+        # through each bucket the trip passes through
+        self.positions = [array.array("d", itertools.accumulate((factor*bucket_hours for factor in row), initial=0)) for row in self.factors]
+        
+    # This method returns the index of the bucket that the provided time, in
+    # hours after 8:00AM, falls in
+    # Big O: O(1)
+    def get_bucket(self, hours):
+        return min(max(int((hours - self.start_time)//self.bucket_hours), 0), self.num_buckets - 1)
+        
+    # This method returns the position, in hours of driving at the normal
+    # speed, that a truck driving on roads of the provided class since
+    # start_time would have reached at the provided time
+    # Big O: O(1)
+    def get_position(self, speed_class, hours):
+        bucket = self.get_bucket(hours)
+        bucket_start = self.start_time + bucket*self.bucket_hours
+        return self.positions[speed_class][bucket] + self.factors[speed_class][bucket]*(hours - bucket_start)
+        
+    # This method returns the time that a truck driving on roads of the
+    # provided class reaches the provided position. The bucket the position
+    # falls in is checked first, since most trips finish in the bucket they
+    # started in
+    # Big O: O(1) if bucket is correct, otherwise O(log b) for b buckets
+    def get_time_at(self, speed_class, position, bucket=0):
+        positions = self.positions[speed_class]
+        if not positions[bucket] <= position < positions[bucket + 1]:
+            bucket = min(max(bisect.bisect_right(positions, position) - 1, 0), self.num_buckets - 1)
+            
+        bucket_start = self.start_time + bucket*self.bucket_hours
+        return bucket_start + (position - positions[bucket])/self.factors[speed_class][bucket]
+        
+    # This method returns the number of hours it takes to drive the provided
+    # number of miles on roads of the provided class, leaving at start_time.
+    # Rounding error can make a trip of 0 miles come out slightly negative, so
+    # the result is never allowed below 0
+    # Big O: O(1) unless the trip crosses into another bucket, then O(log b) for b buckets
+    def get_travel_time(self, speed_class, start_time, miles, speed):
+        start_position = self.get_position(speed_class, start_time)
+        return max(0, self.get_time_at(speed_class, start_position + miles/speed, self.get_bucket(start_time)) - start_time)
+        
+    # This method returns the number of miles driven on roads of the provided
+    # class between two times
+    # Big O: O(1)
+    def get_miles_driven(self, speed_class, start_time, end_time, speed):
+        return (self.get_position(speed_class, end_time) - self.get_position(speed_class, start_time))*speed
+        
+# The Instrumentation class records how often the hot parts of the program run
+# and how long each phase takes, and writes the results to a JSON report. It is
+# off by default. Rather than checking whether it's on inside every hot method,
+# enable() swaps those methods out for counting versions and disable() swaps
+# the originals back in, so nothing extra runs while it's off
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.report_path = None
+        self.dump_interval = None
+        self.last_dump = 0
+        self.originals = []
+        
+        # dump() is registered to run at exit the first time instrumentation
+        # is turned on, and stays registered after that, since it does nothing
+        # while instrumentation is off
+        self.exit_registered = False
+        self.reset()
+        
+    # This method clears all of the recorded counts and timings
+    # Big O: O(1)
+    def reset(self):
+        self.counters = {}
+        self.probe_lengths = {}
+        self.phases = {}
+        
+    # This method adds to one of the counters
+    # Big O: O(1)
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+        
+    # This method turns instrumentation on. The report is written to report_path
+    # whenever a phase finishes, at most once every dump_interval seconds, and
+    # again when the program exits
+    # Big O: O(1)
+    def enable(self, report_path=INSTRUMENTATION_PATH, dump_interval=10):
+        if self.enabled:
+            return
+            
+        self.enabled = True
+        self.report_path = report_path
+        self.dump_interval = dump_interval
+        self.last_dump = time.perf_counter()
+        if not self.exit_registered:
+            atexit.register(self.dump)
+            self.exit_registered = True
+        
+        original_get_val = HashTable.get_val
+        original_get_distance = DistanceTable.get_distance
+        original_package_distance = globals()["get_package_distance"]
+        original_hub_distance = globals()["get_distance_from_hub"]
+        self.originals = [(HashTable, "get_val", original_get_val), (DistanceTable, "get_distance", original_get_distance),
+                          ("get_package_distance", original_package_distance), ("get_distance_from_hub", original_hub_distance)]
+        
+        def get_val(table, key):
+            # Work out how many slots are checked before the key is found
+            mask = table.size - 1
+            index = hash(key) & mask
+            probes = 1
+            while table.key_list[index] is not EMPTY_SLOT and table.key_list[index] != key:
+                index = (index + 1) & mask
+                probes += 1
+                
+            self.count("hashtable_get_val")
+            self.probe_lengths[probes] = self.probe_lengths.get(probes, 0) + 1
+            return original_get_val(table, key)
+            
+        def get_distance(table, id_a, id_b):
+            self.count("distance_lookups")
+            return original_get_distance(table, id_a, id_b)
+            
+        def get_package_distance(package_table, distance_table, pkg_1, pkg_2):
+            self.count("package_distance_lookups")
+            return original_package_distance(package_table, distance_table, pkg_1, pkg_2)
+            
+        def get_distance_from_hub(package_table, distance_table, pkg):
+            self.count("hub_distance_lookups")
+            return original_hub_distance(package_table, distance_table, pkg)
+            
+        HashTable.get_val = get_val
+        DistanceTable.get_distance = get_distance
+        globals()["get_package_distance"] = get_package_distance
+        globals()["get_distance_from_hub"] = get_distance_from_hub
+        
+    # This method turns instrumentation off and puts the original methods back
+    # Big O: O(1)
+    def disable(self):
+        for original in self.originals:
+            if len(original) == 3:
+                setattr(original[0], original[1], original[2])
+            else:
+                globals()[original[0]] = original[1]
+                
+        self.originals = []
+        self.enabled = False
+        
+    # This method returns a context manager that times the code inside it and
+    # adds the time to the named phase
+    # Big O: O(1)
+    def time_phase(self, name):
+        if not self.enabled:
+            return contextlib.nullcontext()
+            
+        return self.PhaseTimer(self, name)
+        
+    class PhaseTimer:
+        def __init__(self, instrumentation, name):
+            self.instrumentation = instrumentation
+            self.name = name
+            
+        def __enter__(self):
+            self.start_time = time.perf_counter()
+            
+        def __exit__(self, *exc_info):
+            self.instrumentation.record_phase(self.name, time.perf_counter() - self.start_time)
+            
+    # This method adds a single timing to the named phase, then writes the
+    # report if enough time has passed since it was last written
+    # Big O: O(1)
+    def record_phase(self, name, seconds):
+        phase = self.phases.setdefault(name, {"calls": 0, "total_seconds": 0, "max_seconds": 0, "last_seconds": 0})
+        phase["calls"] += 1
+        phase["total_seconds"] += seconds
+        phase["max_seconds"] = max(phase["max_seconds"], seconds)
+        phase["last_seconds"] = seconds
+        
+        if self.dump_interval is not None and time.perf_counter() - self.last_dump >= self.dump_interval:
+            self.dump()
+            
+    # This method returns all of the recorded information as a dictionary
+    # Big O: O(p) for p different probe lengths
+    def get_report(self):
+        total_lookups = sum(self.probe_lengths.values())
+        total_probes = sum(length*amount for length, amount in self.probe_lengths.items())
+        
+        return {
+            "counters": dict(self.counters),
+            "hashtable_probes": {
+                "lookups": total_lookups,
+                "mean_length": total_probes/total_lookups if total_lookups else 0,
+                "max_length": max(self.probe_lengths, default=0),
+                "histogram": {str(length): self.probe_lengths[length] for length in sorted(self.probe_lengths)},
+            },
+            "phases": {name: dict(phase) for name, phase in self.phases.items()},
+            "route_cache": route_cache.get_stats(),
+        }
+        
+    # This method writes the report to the report file as JSON
+    # Big O: O(p) for p different probe lengths
+    def dump(self):
+        if not self.enabled or self.report_path is None:
+            return
+            
+        self.last_dump = time.perf_counter()
+        temp_path = f"{self.report_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.get_report(), f, indent=2)
+            
+        os.replace(temp_path, self.report_path)
+        
+# This is the Instrumentation object used throughout the program
+instrumentation = Instrumentation()
+
+# The RouteCache class remembers the routes calculated for recent sets of
+# packages, so that a load that's planned again, such as in every scenario of a
+# sweep, isn't routed from scratch. Each route is stored under the set of
+# package IDs it visits along with the version stamps of the package and
+# distance tables it was calculated from, so any change to either table means
+# the route is calculated again. Once the cache is full, the least recently used
+# route is dropped. Routes are found through a HashTable, and are also kept in a
+# circular doubly linked list running from most to least recently used
+class RouteCache:
+    def __init__(self, max_size=ROUTE_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = HashTable(max_size)
+        
+        # The sentinel node sits between the most and least recently used routes
+        self.sentinel = RouteCache.Node(None, None)
+        self.sentinel.prev = self.sentinel.next = self.sentinel
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    class Node:
+        __slots__ = ("key", "route", "prev", "next")
+        
+        def __init__(self, key, route):
+            self.key = key
+            self.route = route
+            
+    # This method returns the key a route is stored under
+    # Big O: O(n)
+    def get_key(self, package_table, distance_table, package_list):
+        return frozenset(package_list), package_table.version, distance_table.version
+        
+    # This method returns the route stored under the provided key as a
+    # (package route, distance list) tuple, or None if there isn't one
+    # Big O: O(1)
+    def get_route(self, key):
+        if not self.entries.has_key(key):
+            self.misses += 1
+            return None
+            
+        self.hits += 1
+        node = self.entries.get_val(key)
+        self.unlink(node)
+        self.link_first(node)
+        return list(node.route[0]), list(node.route[1])
+        
+    # This method stores a route under the provided key, dropping the least
+    # recently used routes if the cache is full
+    # Big O: O(1)
+    def store_route(self, key, pkg_route, distance_list):
+        if self.max_size < 1:
+            return
+            
+        if self.entries.has_key(key):
+            self.unlink(self.entries.get_val(key))
+            
+        node = RouteCache.Node(key, (tuple(pkg_route), tuple(distance_list)))
+        self.entries.insert_val(key, node)
+        self.link_first(node)
+        self.evict(self.max_size)
+        
+    # This method changes the number of routes the cache can hold
+    # Big O: O(e) for e evicted routes
+    def set_max_size(self, max_size):
+        self.max_size = max_size
+        self.evict(max_size)
+        
+    # This method drops the least recently used routes until at most max_size
+    # are left
+    # Big O: O(e) for e evicted routes
+    def evict(self, max_size):
+        while len(self.entries) > max(0, max_size):
+            node = self.sentinel.prev
+            self.unlink(node)
+            self.entries.delete_val(node.key)
+            self.evictions += 1
+            
+    # These methods remove a node from the list, and add a node to the front of
+    # the list as the most recently used route
+    # Big O: O(1)
+    def unlink(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+        
+    def link_first(self, node):
+        node.prev = self.sentinel
+        node.next = self.sentinel.next
+        self.sentinel.next.prev = node
+        self.sentinel.next = node
+        
+    # This method returns the hit and miss counts and the size of the cache
+    # Big O: O(1)
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits/lookups if lookups else 0,
+        }
+        
+# This is the RouteCache used when planning the day
+route_cache = RouteCache()
+
 # The Package class represents the packages being delivered on the trucks
 class Package:
-    def __init__(self, pkg_id, address, city, state, zipcode, deadline, mass, arrival_time):
+    __slots__ = ("package_id", "address", "address_id", "city", "state", "zipcode", "deadline", "mass", "arrival_time", "notes",
+                 "deadline_minutes", "arrival_minutes")
+    
+    def __init__(self, pkg_id, address, city, state, zipcode, deadline, mass, arrival_time, notes, address_id):
         self.package_id = pkg_id
         self.address = address
+        self.address_id = address_id
         self.city = city
         self.state = state
         self.zipcode = zipcode
         self.deadline = deadline
         self.mass = mass
         self.arrival_time = arrival_time
-        self.delivery_status = 0
-        self.delivery_time = None
-        self.carrier = None
+        self.notes = notes
         
-    # This method reads the current delivery status ID (0, 1, or 2) and returns
-    # a string explaining the status
+        # The deadline and arrival time are parsed once here and stored as the
+        # number of minutes after 8:00AM, so they never have to be parsed again
+        if deadline == "EOD":
+            self.deadline_minutes = END_OF_DAY*60
+        else:
+            self.deadline_minutes = time_to_minutes(deadline) - 8*60
+            
+        if arrival_time == "BOD":
+            self.arrival_minutes = 0
+        else:
+            self.arrival_minutes = time_to_minutes(arrival_time) - 8*60
+            
+    # This method returns the values this package was created from, in the
+    # order the constructor takes them, so an identical package can be made
+    # with Package(*row)
     # Big O: O(1)
-    def get_status(self):
-        if self.delivery_status == 0:
+    def get_row(self):
+        return (self.package_id, self.address, self.city, self.state, self.zipcode, self.deadline, self.mass, self.arrival_time, self.notes,
+                self.address_id)
+        
+    # This method reads this package's delivery status ID (0, 1, or 2) from the
+    # provided SimulationSnapshot and returns a string explaining the status
+    # Big O: O(1)
+    def get_status(self, snapshot):
+        return self.describe_state(*snapshot.get_package_state(self.package_id))
+        
+    # This method takes a delivery status ID (0, 1, or 2), delivery time, and
+    # carrier for this package and returns a string explaining the status
+    # Big O: O(1)
+    def describe_state(self, delivery_status, delivery_time, carrier):
+        if delivery_status == 0:
             return "At the hub"
         
-        if self.delivery_status == 1:
-            return f"In transit on {self.carrier}"
+        if delivery_status == 1:
+            return f"In transit on {carrier}"
             
-        if self.delivery_status == 2:
-            if self.delivery_time > self.get_deadline():
+        if delivery_status == 2:
+            if delivery_time > self.get_deadline():
                 return "Late!"
-            return f"Delivered at {float_to_time(self.delivery_time, 8)} by {self.carrier}"
+            return f"Delivered at {float_to_time(delivery_time, 8)} by {carrier}"
             
-    # This method converts this package's deadline to a float and returns it
+    # This method returns this package's deadline as a number of hours after 8:00AM
     # Big O: O(1)
     def get_deadline(self):
-        if self.deadline == "EOD":
-            return 16
+        return self.deadline_minutes/60
+        
+    # This method returns this package's arrival time as a number of hours
+    # after 8:00AM
+    # Big O: O(1)
+    def get_arrival_time(self):
+        return self.arrival_minutes/60
+        
+    # This method reads this package's special notes and returns the index of
+    # the truck it is restricted to (0 for truck 1), or None if it isn't
+    # Big O: O(1)
+    def get_required_truck(self):
+        match = re.search(r"only be on truck (\d+)", self.notes, re.IGNORECASE)
+        if match is None:
+            return None
+            
+        return int(match.group(1)) - 1
+        
+    # This method reads this package's special notes and returns the list of
+    # package IDs it must be delivered with
+    # Big O: O(1)
+    def get_delivered_with(self):
+        match = re.search(r"delivered with ([\d,\s]+)", self.notes, re.IGNORECASE)
+        if match is None:
+            return []
+            
+        return [int(pkg_id) for pkg_id in re.findall(r"\d+", match.group(1))]
+   
+# The Simulator class is used to simulate our trucks on their deliveries and
+# record all the information
+class Simulator:
+    def __init__(self, speed=TRUCK_SPEED, route_cache=None):
+        # This is the speed of the trucks in miles/hour
+        self.speed = speed
+        
+        # If a RouteCache is provided, routes are looked up in it before
+        # they're calculated
+        self.route_cache = route_cache
+    
+    # This method takes a list of delivery parameters including a list of packages,
+    # a number of hours passed, and a departure time, and simulates a delivery
+    # with those parameters. It then returns a SimulationResult object that
+    # details the outcome of the simulation. The packages themselves are left
+    # untouched, so any number of simulations can run at once
+    # Big O: O(n^2)
+    def simulate_delivery(self, truck_name, package_table, distance_table, package_list, departure_time, hours_passed):
+        truck_timeline = self.create_truck_timeline(truck_name, package_table, distance_table, package_list, departure_time)
+        return truck_timeline.get_result(hours_passed)
+        
+    # This method checks whether every package in a list can make its deadline
+    # if the truck leaves the hub at the provided time, and returns the ID of a
+    # package that would be late, or None if they're all on time. Packages that
+    # couldn't make their deadline even on the quickest possible trip from the
+    # hub are looked for first, in list order, so impossible loads are rejected
+    # without a route. Otherwise the route is followed and the first late
+    # package on it is returned. If ordered is true, package_list is the route,
+    # otherwise the route that calculate_delivery_route() picks is used, and it
+    # stops being built as soon as a package would be late
+    # Big O: O(n) if ordered or a package can't make its deadline at all, otherwise the same as calculate_delivery_route()
+    def find_late_package(self, package_table, distance_table, package_list, departure_time, ordered=False):
+        speed = self.speed
+        hub_id = distance_table.get_hub_id()
+        
+        for pkg_id in package_list:
+            package = package_table.get_val(pkg_id)
+            if distance_table.get_min_travel_time(package.address_id, speed) + departure_time > package.get_deadline():
+                if instrumentation.enabled:
+                    instrumentation.count("feasibility_pruned")
+                return pkg_id
+                
+        if ordered:
+            pkg_route = package_list
+            address_ids = [hub_id] + [package_table.get_val(pkg_id).address_id for pkg_id in pkg_route]
+            distance_list = [distance_table.get_distance(address_ids[index], address_ids[index + 1]) for index in range(len(pkg_route))]
+        else:
+            pkg_route, distance_list = self.get_delivery_route(package_table, distance_table, package_list, departure_time, True)
+            
+        if instrumentation.enabled:
+            instrumentation.count("feasibility_routes")
+            
+        # The times are worked out in the same order as a TruckTimeline, so a
+        # package is late here exactly when the timeline would say so
+        speed_profile = distance_table.speed_profile
+        miles = 0
+        clock = departure_time
+        address_id = hub_id
+        for pkg_id, distance in zip(pkg_route, distance_list):
+            package = package_table.get_val(pkg_id)
+            if speed_profile is None:
+                miles += distance
+                clock = miles/speed + departure_time
+            else:
+                clock += speed_profile.get_travel_time(distance_table.get_speed_class(address_id, package.address_id), clock, distance, speed)
+                address_id = package.address_id
+                
+            if clock > package.get_deadline():
+                return pkg_id
+                
+        return None
+        
+    # This method evaluates an efficient order to deliver a list of packages in
+    # and records the whole trip in a TruckTimeline object. The route doesn't
+    # depend on the time, so this only needs to happen once per trip.
+    # If improve_time is provided, the route is then improved using local
+    # search for up to that many seconds
+    # Big O: O(n^2)
+    def create_truck_timeline(self, truck_name, package_table, distance_table, package_list, departure_time, follows=None, improve_time=None,
+                              ready_time=None, truck_index=None, driver_index=None):
+        pkg_route, distance_list = self.get_delivery_route(package_table, distance_table, package_list, departure_time)
+        
+        if improve_time is not None and departure_time is not None:
+            pkg_route, distance_list = self.improve_delivery_route(package_table, distance_table, pkg_route, departure_time, improve_time)
+            
+        leg_classes = get_leg_classes(package_table, distance_table, pkg_route)
+        return TruckTimeline(truck_name, pkg_route, distance_list, departure_time, follows, self.speed, ready_time, truck_index, driver_index,
+                             distance_table.speed_profile, leg_classes)
+        
+    # This method returns the route calculate_delivery_route() would return for
+    # the provided packages, using the route cache if there is one. Routes only
+    # depend on the departure time and the truck's speed when the roads have
+    # their own speed classes, so that's the only time they're part of the key.
+    # The speed is needed since Simulators with different speeds can share a
+    # cache. A route that was cut short at a late package is never cached,
+    # since it doesn't visit every package
+    # Big O: O(n) if the route is cached, otherwise the same as calculate_delivery_route()
+    def get_delivery_route(self, package_table, distance_table, package_list, departure_time=None, stop_if_late=False):
+        if self.route_cache is None:
+            return self.calculate_delivery_route(package_table, distance_table, package_list, departure_time, stop_if_late)
+            
+        key = self.route_cache.get_key(package_table, distance_table, package_list)
+        if self.uses_travel_time(distance_table, departure_time):
+            key += (departure_time, self.speed)
+            
+        route = self.route_cache.get_route(key)
+        if route is None:
+            route = self.calculate_delivery_route(package_table, distance_table, package_list, departure_time, stop_if_late)
+            if len(route[1]) > len(route[0]):
+                self.route_cache.store_route(key, *route)
+            
+        return route
+        
+    # This method returns true if routes leaving at the provided time should be
+    # chosen by travel time rather than by distance. With only a SpeedProfile,
+    # every road slows down by the same amount, so the closest address is
+    # always the quickest one to reach. It's only when pairs of addresses have
+    # their own speed classes that the two can differ
+    # Big O: O(1)
+    def uses_travel_time(self, distance_table, departure_time):
+        return departure_time is not None and distance_table.speed_profile is not None and distance_table.speed_classes is not None
+        
+    # This method uses a greedy algorithm to determine a good order
+    # to deliver a given list of packages in. At every step, it goes to the
+    # closest package if it's within CLOSE_DISTANCE miles of the current
+    # address. Otherwise, it prioritizes packages with the earliest deadline
+    # and goes to the closest one of those instead. Candidates are found by
+    # looking through the current address's nearest neighbors first, and every
+    # remaining address is only checked if none of the neighbors are suitable.
+    # If uses_travel_time() is true, the closest address is the one that takes
+    # the least time to reach, and every remaining address is checked. If
+    # stop_if_late is true, the route stops at the first package that would be
+    # late leaving at departure_time, without the trip back to the hub
+    # Big O: O(n*k) for k nearest neighbors, O(n^2) if neighbors are rarely suitable or with travel times
+    def calculate_delivery_route(self, package_table, distance_table, package_list, departure_time=None, stop_if_late=False):
+        if not package_list:
+            return [], [0]
+            
+        optimal_route = []
+        distance_list = []
+        
+        # Group the packages by address. Each address's packages are sorted so
+        # that the one with the earliest deadline is at the end of the list
+        packages = [package_table.get_val(pkg_id) for pkg_id in package_list]
+        order = sorted(range(len(packages)), key=lambda index: (-packages[index].deadline_minutes, -index))
+        address_packages = HashTable(len(packages))
+        for index in order:
+            package = packages[index]
+            if not address_packages.has_key(package.address_id):
+                address_packages.insert_val(package.address_id, [])
+            address_packages.get_val(package.address_id).append(package)
+            
+        # Keep count of how many packages remain for each deadline, so we always
+        # know the earliest deadline that still has packages left
+        deadlines = sorted({package.deadline_minutes for package in packages})
+        deadline_counts = HashTable(len(deadlines))
+        deadline_counts.bulk_insert((deadline, 0) for deadline in deadlines)
+        for package in packages:
+            deadline_counts.insert_val(package.deadline_minutes, deadline_counts.get_val(package.deadline_minutes) + 1)
+            
+        pending_addresses = set(address_packages)
+        use_travel_time = self.uses_travel_time(distance_table, departure_time)
+        speed_profile = distance_table.speed_profile
+        miles = 0
+        clock = departure_time
+        candidates_checked = 0
+        earliest_index = 0
+        current_address = distance_table.get_hub_id()
+        
+        # Loop until all packages have been placed into the route
+        while pending_addresses:
+            while deadline_counts.get_val(deadlines[earliest_index]) == 0:
+                earliest_index += 1
+            earliest_deadline = deadlines[earliest_index]
+            
+            best_address = None
+            
+            # The neighbors are sorted by distance, so the first one with packages
+            # left is the closest one. If it isn't close enough, we look for the
+            # closest one with packages due at the earliest deadline
+            for neighbor in distance_table.get_nearest_addresses(current_address) if not use_travel_time else ():
+                candidates_checked += 1
+                if neighbor not in pending_addresses:
+                    continue
+                    
+                if distance_table.get_distance(current_address, neighbor) <= CLOSE_DISTANCE:
+                    best_address = neighbor
+                    break
+                    
+                if address_packages.get_val(neighbor)[-1].deadline_minutes == earliest_deadline:
+                    best_address = neighbor
+                    break
+                    
+            # If none of the neighbors were suitable, check every address that
+            # still has packages left
+            if best_address is None:
+                candidates_checked += len(pending_addresses)
+                if use_travel_time:
+                    leg_cost = lambda address: (distance_table.get_travel_time(current_address, address, clock, self.speed), address)
+                else:
+                    leg_cost = lambda address: (distance_table.get_distance(current_address, address), address)
+                    
+                closest = min(pending_addresses, key=leg_cost)
+                if distance_table.get_distance(current_address, closest) <= CLOSE_DISTANCE:
+                    best_address = closest
+                else:
+                    urgent = (address for address in pending_addresses if address_packages.get_val(address)[-1].deadline_minutes == earliest_deadline)
+                    best_address = min(urgent, key=leg_cost)
+                    
+            # Deliver the package at that address with the earliest deadline
+            remaining = address_packages.get_val(best_address)
+            best_package = remaining.pop()
+            if not remaining:
+                pending_addresses.discard(best_address)
+                
+            deadline_counts.insert_val(best_package.deadline_minutes, deadline_counts.get_val(best_package.deadline_minutes) - 1)
+            optimal_route.append(best_package.package_id)
+            distance_list.append(distance_table.get_distance(current_address, best_address))
+            
+            # The clock is kept the same way a TruckTimeline works out its
+            # delivery times
+            if departure_time is not None and speed_profile is not None:
+                clock += speed_profile.get_travel_time(distance_table.get_speed_class(current_address, best_address), clock, distance_list[-1], self.speed)
+            elif departure_time is not None:
+                miles += distance_list[-1]
+                clock = miles/self.speed + departure_time
+                
+            current_address = best_address
+            if stop_if_late and clock > best_package.get_deadline():
+                return optimal_route, distance_list
+        
+        # Add the distance needed to travel from the final point back to the hub
+        distance_list.append(get_distance_from_hub(package_table, distance_table, optimal_route[-1]))
+        
+        if instrumentation.enabled:
+            instrumentation.count("route_candidates", candidates_checked)
+            instrumentation.count("routes_calculated")
+            
+        return optimal_route, distance_list
+    
+    # This method takes a route created by calculate_delivery_route() and
+    # improves it using local search. It repeatedly tries two kinds of moves:
+    #   - 2-opt: reversing a section of the route, which removes crossings
+    #   - Or-opt: moving a run of 1 to 3 stops to somewhere else in the route
+    # Each move is scored by the change in distance of the edges it touches, and
+    # a move is only made if it shortens the route without making any package
+    # late that wasn't already late. The search stops when no move helps or
+    # when time_budget seconds have passed
+    # Big O: O(n^2) per pass
+    def improve_delivery_route(self, package_table, distance_table, pkg_route, departure_time, time_budget):
+        stop_time = time.perf_counter() + time_budget
+        speed = self.speed
+        
+        hub_id = distance_table.get_hub_id()
+        
+        # The route is stored as a list of address IDs which starts and ends at
+        # the hub, so route[i] is the address of pkg_route[i - 1]
+        packages = [package_table.get_val(pkg_id) for pkg_id in pkg_route]
+        route = [hub_id] + [pkg.address_id for pkg in packages] + [hub_id]
+        
+        # Packages that are already late on the initial route are allowed to
+        # stay late, every other package has to stay on time
+        deadlines = [pkg.get_deadline() for pkg in packages]
+        late_pkgs = self.get_late_positions(route, packages, deadlines, departure_time, distance_table)
+        allowed_late = {packages[i].package_id for i in late_pkgs}
+        
+        # The distances between the route's addresses are copied into a small
+        # square matrix, and the route is switched to IDs within that matrix, so
+        # every distance in the loops below is a single index operation
+        local_ids = HashTable(len(route))
+        route_addresses = []
+        for address_id in route:
+            if not local_ids.has_key(address_id):
+                local_ids.insert_val(address_id, len(route_addresses))
+                route_addresses.append(address_id)
+                
+        size = len(route_addresses)
+        matrix = [distance_table.get_distance(id_a, id_b) for id_a in route_addresses for id_b in route_addresses]
+        route = [local_ids.get_val(address_id) for address_id in route]
+        
+        # With a SpeedProfile the delivery times depend on when each leg is
+        # driven, so they're worked out on the full route instead
+        def is_feasible(new_route, new_packages, new_deadlines):
+            if distance_table.speed_profile is not None:
+                delivery_times = self.get_delivery_times(distance_table, [route_addresses[address] for address in new_route], departure_time)
+                return all(delivery_time <= deadline or package.package_id in allowed_late
+                           for delivery_time, deadline, package in zip(delivery_times, new_deadlines, new_packages))
+                
+            miles = 0
+            for index in range(1, len(new_route) - 1):
+                miles += matrix[new_route[index - 1]*size + new_route[index]]
+                if miles/speed + departure_time > new_deadlines[index - 1] and new_packages[index - 1].package_id not in allowed_late:
+                    return False
+            return True
+            
+        improved = True
+        while improved and time.perf_counter() < stop_time:
+            improved = False
+            num_stops = len(packages)
+            
+            # 2-opt: reverse the section of the route from i to j
+            for i in range(1, num_stops):
+                if time.perf_counter() >= stop_time:
+                    break
+                    
+                a, b = route[i - 1], route[i]
+                for j in range(i + 1, num_stops + 1):
+                    c, d = route[j], route[j + 1]
+                    delta = matrix[a*size + c] + matrix[b*size + d] - matrix[a*size + b] - matrix[c*size + d]
+                    if delta > -1e-9:
+                        continue
+                        
+                    new_route = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+                    new_packages = packages[:i - 1] + packages[i - 1:j][::-1] + packages[j:]
+                    new_deadlines = deadlines[:i - 1] + deadlines[i - 1:j][::-1] + deadlines[j:]
+                    if is_feasible(new_route, new_packages, new_deadlines):
+                        route, packages, deadlines = new_route, new_packages, new_deadlines
+                        a, b = route[i - 1], route[i]
+                        improved = True
+                        
+            # Or-opt: move the section of the route from i to i + length - 1 so
+            # that it sits between positions k and k + 1
+            for length in (1, 2, 3):
+                for i in range(1, num_stops - length + 2):
+                    if time.perf_counter() >= stop_time:
+                        break
+                        
+                    end = i + length - 1
+                    prev, first, last, after = route[i - 1], route[i], route[end], route[end + 1]
+                    removed = matrix[prev*size + after] - matrix[prev*size + first] - matrix[last*size + after]
+                    
+                    for k in range(num_stops + 1):
+                        if i - 1 <= k <= end:
+                            continue
+                            
+                        a, b = route[k], route[k + 1]
+                        delta = removed + matrix[a*size + first] + matrix[last*size + b] - matrix[a*size + b]
+                        if delta > -1e-9:
+                            continue
+                            
+                        if k < i:
+                            order = list(range(k + 1)) + list(range(i, end + 1)) + list(range(k + 1, i)) + list(range(end + 1, len(route)))
+                        else:
+                            order = list(range(i)) + list(range(end + 1, k + 1)) + list(range(i, end + 1)) + list(range(k + 1, len(route)))
+                            
+                        new_route = [route[x] for x in order]
+                        new_packages = [packages[x - 1] for x in order[1:-1]]
+                        new_deadlines = [deadlines[x - 1] for x in order[1:-1]]
+                        if is_feasible(new_route, new_packages, new_deadlines):
+                            route, packages, deadlines = new_route, new_packages, new_deadlines
+                            improved = True
+                            break
+                            
+        # Rebuild the route and distance list in the same form returned by
+        # calculate_delivery_route()
+        pkg_route = [pkg.package_id for pkg in packages]
+        distance_list = [matrix[route[index - 1]*size + route[index]] for index in range(1, len(route))]
+        return pkg_route, distance_list
+        
+    # This method returns the positions of the packages that would be late if
+    # they were delivered in the order of the provided route
+    # Big O: O(n)
+    def get_late_positions(self, route, packages, deadlines, departure_time, distance_table):
+        delivery_times = self.get_delivery_times(distance_table, route, departure_time)
+        return [index for index, delivery_time in enumerate(delivery_times) if delivery_time > deadlines[index]]
+        
+    # This method returns the time each stop is reached on a route of address
+    # IDs that starts and ends at the hub, not including the hub at the end.
+    # The times are worked out the same way a TruckTimeline does it
+    # Big O: O(n)
+    def get_delivery_times(self, distance_table, route, departure_time):
+        delivery_times = []
+        speed_profile = distance_table.speed_profile
+        miles = 0
+        clock = departure_time
+        
+        for index in range(1, len(route) - 1):
+            distance = distance_table.get_distance(route[index - 1], route[index])
+            if speed_profile is None:
+                miles += distance
+                clock = miles/self.speed + departure_time
+            else:
+                clock += speed_profile.get_travel_time(distance_table.get_speed_class(route[index - 1], route[index]), clock, distance, self.speed)
+            delivery_times.append(clock)
+            
+        return delivery_times
+        
+# The TruckTimeline class records a single truck trip from start to finish: the
+# route, the number of miles needed to reach each stop, and the time that each
+# package gets delivered. The state of the trip at any given time can then be
+# looked up with a binary search instead of simulating the trip again
+class TruckTimeline:
+    def __init__(self, truck_name, pkg_route, distance_list, departure_time, follows=None, speed=TRUCK_SPEED, ready_time=None, truck_index=None,
+                 driver_index=None, speed_profile=None, leg_classes=None):
+        self.truck_name = truck_name
+        self.pkg_route = pkg_route
+        self.distance_list = distance_list
+        self.departure_time = departure_time
+        self.speed = speed
+        
+        # If a SpeedProfile is provided, leg_classes holds the speed class of
+        # each leg in distance_list, and the time of each leg depends on when
+        # it's driven instead of being a constant speed
+        self.speed_profile = speed_profile
+        self.leg_classes = leg_classes
+        
+        # truck_index and driver_index are the truck and driver this trip was
+        # planned for, and ready_time is the earliest the trip could leave if
+        # they were free. These are needed to move the trip if the trips before
+        # it change
+        self.truck_index = truck_index
+        self.driver_index = driver_index
+        self.ready_time = departure_time if ready_time is None else ready_time
+        
+        # If this trip needs a truck or driver to return to the hub before it
+        # can start, follows is the list of trips that have to finish first
+        self.follows = follows or []
+        
+        # cumulative_miles[i] is the number of miles needed to deliver the
+        # package at pkg_route[i], with the final entry being the trip back to the hub
+        self.cumulative_miles = list(itertools.accumulate(distance_list))
+        self.route_length = sum(distance_list)
+        
+        # With a SpeedProfile, leg_end_times[i] is the time the truck finishes
+        # the leg at distance_list[i], found by driving each leg in turn
+        self.leg_end_times = None
+        
+        if departure_time is None:
+            self.delivery_times = []
+            self.end_time = None
+        elif speed_profile is None:
+            self.delivery_times = [miles/speed + departure_time for miles in self.cumulative_miles[:len(pkg_route)]]
+            self.end_time = self.route_length/speed + departure_time
+        else:
+            self.leg_end_times = []
+            clock = departure_time
+            for distance, speed_class in zip(distance_list, leg_classes):
+                clock += speed_profile.get_travel_time(speed_class, clock, distance, speed)
+                self.leg_end_times.append(clock)
+                
+            self.delivery_times = self.leg_end_times[:len(pkg_route)]
+            self.end_time = clock
+            
+    # This method returns true if a truck has been assigned to this trip by
+    # the provided time, false otherwise
+    # Big O: O(1)
+    def is_assigned(self, hours_passed):
+        if self.departure_time is None:
+            return False
+            
+        return all(trip.was_completed(hours_passed) for trip in self.follows)
+        
+    # This method returns the number of miles the truck has traveled by the
+    # provided time
+    # Big O: O(1) with a constant speed, O(log n) with a SpeedProfile
+    def get_distance_traveled(self, hours_passed):
+        if not self.is_assigned(hours_passed):
+            return 0
+            
+        return self.get_distance_driven(hours_passed)
+        
+    # This method returns the number of miles the truck has traveled by the
+    # provided time if it left at its departure time, without checking whether
+    # a truck had been assigned yet. With a SpeedProfile, the leg being driven
+    # is found with a binary search and the miles into that leg are read from
+    # the profile
+    # Big O: O(1) with a constant speed, O(log n) with a SpeedProfile
+    def get_distance_driven(self, hours_passed):
+        if self.speed_profile is None:
+            return max(0, min(self.route_length, self.speed*(hours_passed - self.departure_time)))
+            
+        if hours_passed <= self.departure_time:
+            return 0
+            
+        if hours_passed >= self.end_time:
+            return self.route_length
+            
+        leg = bisect.bisect_right(self.leg_end_times, hours_passed)
+        leg_start = self.leg_end_times[leg - 1] if leg > 0 else self.departure_time
+        miles_before = self.cumulative_miles[leg - 1] if leg > 0 else 0
+        miles_driven = self.speed_profile.get_miles_driven(self.leg_classes[leg], leg_start, hours_passed, self.speed)
+        return min(self.cumulative_miles[leg], miles_before + miles_driven)
+        
+    # This method returns true if the trip was completed by the provided time.
+    # A trip never departs before the trips it follows have finished, so
+    # there's no need to check whether it had been assigned a truck
+    # Big O: O(1) with a constant speed, O(log n) with a SpeedProfile
+    def was_completed(self, hours_passed):
+        if self.departure_time is None:
+            return False
+            
+        return self.get_distance_driven(hours_passed) >= self.route_length
+        
+    # This method returns the number of packages delivered after the provided
+    # number of miles have been traveled
+    # Big O: O(log n)
+    def get_total_delivered(self, distance_traveled):
+        # If distance_traveled == 0, then no packages have left the hub
+        if distance_traveled == 0:
+            return 0
+            
+        return bisect.bisect_right(self.cumulative_miles, distance_traveled, 0, len(self.pkg_route))
+        
+    # This method returns a SimulationResult object detailing the state of the
+    # trip at the provided time
+    # Big O: O(log n)
+    def get_result(self, hours_passed):
+        # If a truck hasn't been assigned yet, then the trip hasn't started
+        if not self.is_assigned(hours_passed):
+            return self.create_result(hours_passed, False, 0, 0)
+            
+        distance_traveled = self.get_distance_traveled(hours_passed)
+        return self.create_result(hours_passed, True, distance_traveled, self.get_total_delivered(distance_traveled))
+        
+    # This method returns a SimulationResult object for the trip from values
+    # that have already been worked out, so a SimulationReplay can rebuild the
+    # results at any of its times without searching the route again
+    # Big O: O(1)
+    def create_result(self, hours_passed, assigned, distance_traveled, total_delivered):
+        num_packages = len(self.pkg_route)
+        if not assigned:
+            truck_name = "No truck" if self.follows else self.truck_name
+            return SimulationResult(truck_name, None, hours_passed, 0, 0, self.route_length, num_packages, 0)
+            
+        # time_ended is when the truck reached the miles it has traveled
+        if self.speed_profile is None:
+            time_ended = distance_traveled/self.speed + self.departure_time
+        else:
+            time_ended = min(max(hours_passed, self.departure_time), self.end_time)
+        return SimulationResult(self.truck_name, self.departure_time, hours_passed, time_ended, distance_traveled, self.route_length, num_packages, total_delivered)
+        
+    # This method returns the delivery status ID, delivery time, and carrier of
+    # the package at the provided position in the route at the provided time
+    # Big O: O(1)
+    def get_package_state(self, index, hours_passed):
+        distance_traveled = self.get_distance_traveled(hours_passed)
+        
+        # If distance_traveled == 0, then the package hasn't left the hub
+        if distance_traveled == 0:
+            return 0, None, None
+            
+        # If distance_traveled < the miles needed to reach the package, then
+        # the package is in transit
+        if distance_traveled < self.cumulative_miles[index]:
+            return 1, None, self.truck_name
+            
+        # Otherwise, the package has been delivered
+        return 2, self.delivery_times[index], self.truck_name
+        
+# The DayTimeline class holds the TruckTimelines for every trip made during the
+# day. It is created once, and then used to answer any number of queries about
+# the state of the trucks and packages at a given time
+class DayTimeline:
+    def __init__(self, truck_timelines):
+        self.truck_timelines = truck_timelines
+        
+        # Every package is given a row, with the packages on each trip stored
+        # together in route order. trip_offsets[i] is the first row used by
+        # trip i, so the rows of a trip can be filled in with a single slice
+        self.trip_offsets = list(itertools.accumulate((len(trip.pkg_route) for trip in truck_timelines), initial=0))
+        self.num_packages = self.trip_offsets.pop()
+        self.package_rows = HashTable(self.num_packages)
+        self.package_rows.bulk_insert((pkg_id, row) for row, pkg_id in enumerate(pkg_id for trip in truck_timelines for pkg_id in trip.pkg_route))
+        
+        # These columns never change after the DayTimeline is created, so they
+        # are shared by every SimulationSnapshot instead of being copied
+        self.row_trips = array.array("l", (trip_index for trip_index, trip in enumerate(truck_timelines) for _ in trip.pkg_route))
+        self.delivery_times = array.array("d", (trip.delivery_times[index] if trip.delivery_times else 0 for trip in truck_timelines for index in range(len(trip.pkg_route))))
+        
+    # This method returns a SimulationResult object for each trip at the
+    # provided time
+    # Big O: O(t*log n) for t trips
+    def get_results(self, hours_passed):
+        return [trip.get_result(hours_passed) for trip in self.truck_timelines]
+        
+    # This method returns the delivery status ID, delivery time, and carrier of
+    # a single package at the provided time. Packages that aren't on any trip
+    # are still at the hub
+    # Big O: O(1)
+    def get_package_state(self, pkg_id, hours_passed):
+        if not self.package_rows.has_key(pkg_id):
+            return 0, None, None
+            
+        trip, index = self.get_package_position(pkg_id)
+        return trip.get_package_state(index, hours_passed)
+        
+    # This method returns the trip a package is on and its position in that
+    # trip's route
+    # Big O: O(1)
+    def get_package_position(self, pkg_id):
+        row = self.package_rows.get_val(pkg_id)
+        trip_index = self.row_trips[row]
+        return self.truck_timelines[trip_index], row - self.trip_offsets[trip_index]
+        
+    # This method returns a SimulationSnapshot holding the state of every trip
+    # and package at the provided time. Each package's status is stored as a
+    # single byte, and since the packages on a trip are delivered in route
+    # order, each trip only needs two slices: delivered and in transit
+    # Big O: O(n + t*log n) for t trips
+    def get_snapshot(self, hours_passed):
+        return self.create_snapshot(hours_passed, self.get_results(hours_passed))
+        
+    # This method returns a SimulationSnapshot built from a SimulationResult
+    # for each trip, filling in the status column one trip at a time
+    # Big O: O(n + t) for t trips
+    def create_snapshot(self, hours_passed, results):
+        statuses = bytearray(self.num_packages)
+        
+        for offset, trip, result in zip(self.trip_offsets, self.truck_timelines, results):
+            # If distance_traveled == 0, then none of the packages have left the hub
+            if result.distance_traveled == 0:
+                continue
+                
+            delivered_end = offset + result.total_delivered
+            route_end = offset + result.num_packages
+            statuses[offset:delivered_end] = b"\x02"*result.total_delivered
+            statuses[delivered_end:route_end] = b"\x01"*(route_end - delivered_end)
+            
+        return SimulationSnapshot(hours_passed, results, bytes(statuses), self)
+        
+    # This method returns a SimulationReplay holding the state of every trip
+    # and package at each of the provided times. The times are visited in
+    # sorted order, so the miles traveled on each trip only ever increase and
+    # the number of packages delivered can be found by stepping forward
+    # through the trip's cumulative miles instead of searching them again at
+    # every time. Each package only stores the first time it left the hub and
+    # the first time it was delivered, rather than a status for every time
+    # Big O: O(n + t*q + q*log q) for t trips and q times
+    def get_replay(self, times):
+        times = list(times)
+        num_times = len(times)
+        order = sorted(range(num_times), key=times.__getitem__)
+        ranks = array.array("l", [0])*num_times
+        for rank, time_index in enumerate(order):
+            ranks[time_index] = rank
+            
+        # A package that never leaves the hub or is never delivered by the
+        # last time is given num_times, which is past every rank
+        departed_ranks = array.array("l", [num_times])*self.num_packages
+        delivered_ranks = array.array("l", [num_times])*self.num_packages
+        trip_miles = []
+        trip_assigned = []
+        trip_delivered = []
+        
+        for offset, trip in zip(self.trip_offsets, self.truck_timelines):
+            num_packages = len(trip.pkg_route)
+            cumulative_miles = trip.cumulative_miles
+            miles = array.array("d", [0])*num_times
+            assigned = bytearray(num_times)
+            delivered = array.array("l", [0])*num_times
+            departed_rank = num_times
+            total_delivered = 0
+            is_assigned = False
+            
+            for rank, time_index in enumerate(order):
+                hours_passed = times[time_index]
+                
+                # Once a truck has been assigned it stays assigned, so the
+                # trips this one follows only need to be checked until then
+                is_assigned = is_assigned or trip.is_assigned(hours_passed)
+                if not is_assigned:
+                    continue
+                    
+                distance_traveled = trip.get_distance_driven(hours_passed)
+                assigned[time_index] = 1
+                miles[time_index] = distance_traveled
+                
+                # If distance_traveled == 0, then no packages have left the hub
+                if distance_traveled == 0:
+                    continue
+                    
+                if departed_rank == num_times:
+                    departed_rank = rank
+                    
+                while total_delivered < num_packages and cumulative_miles[total_delivered] <= distance_traveled:
+                    delivered_ranks[offset + total_delivered] = rank
+                    total_delivered += 1
+                    
+                delivered[time_index] = total_delivered
+                
+            departed_ranks[offset:offset + num_packages] = array.array("l", [departed_rank])*num_packages
+            trip_miles.append(miles)
+            trip_assigned.append(bytes(assigned))
+            trip_delivered.append(delivered)
+            
+        return SimulationReplay(times, ranks, trip_miles, trip_assigned, trip_delivered, departed_ranks, delivered_ranks, self)
+        
+    # This method returns the total number of miles driven over the day
+    # Big O: O(t) for t trips
+    def get_total_miles(self):
+        return sum(trip.route_length for trip in self.truck_timelines)
+        
+    # This method returns the time that the last truck returns to the hub
+    # Big O: O(t) for t trips
+    def get_completion_time(self):
+        return max((trip.end_time for trip in self.truck_timelines if trip.end_time is not None), default=0)
+        
+    # This method returns the number of packages that will be delivered after
+    # their deadline
+    # Big O: O(n)
+    def count_late_packages(self, package_table):
+        num_late = 0
+        for trip in self.truck_timelines:
+            for index, pkg_id in enumerate(trip.pkg_route):
+                if trip.delivery_times and trip.delivery_times[index] > package_table.get_val(pkg_id).get_deadline():
+                    num_late += 1
+                    
+        return num_late
+            
+# The SimulationSnapshot class holds the state of every package at a single
+# point in time. It is never changed after it is created, so it can be shared
+# between threads and cached without any locking. Only the status column is
+# stored here, the rest is read from the DayTimeline it was taken from
+class SimulationSnapshot:
+    __slots__ = ("hours_passed", "results", "statuses", "day_timeline")
+    
+    def __init__(self, hours_passed, results, statuses, day_timeline):
+        self.hours_passed = hours_passed
+        self.results = tuple(results)
+        self.statuses = statuses
+        self.day_timeline = day_timeline
+        
+    # This method returns the delivery status ID, delivery time, and carrier of
+    # a single package. Packages that aren't on any trip are still at the hub
+    # Big O: O(1)
+    def get_package_state(self, pkg_id):
+        day_timeline = self.day_timeline
+        if not day_timeline.package_rows.has_key(pkg_id):
+            return 0, None, None
+            
+        row = day_timeline.package_rows.get_val(pkg_id)
+        status = self.statuses[row]
+        if status == 0:
+            return 0, None, None
+            
+        carrier = day_timeline.truck_timelines[day_timeline.row_trips[row]].truck_name
+        if status == 1:
+            return 1, None, carrier
+            
+        return 2, day_timeline.delivery_times[row], carrier
+        
+# The SimulationReplay class holds the state of every trip and package at a
+# list of times, created by DayTimeline.get_replay. Each trip has a column of
+# miles traveled, assignment flags, and packages delivered with one entry per
+# time, and each package has the rank of the first sorted time it was in
+# transit and the first it was delivered. Like a SimulationSnapshot, it is
+# never changed after it is created
+class SimulationReplay:
+    __slots__ = ("times", "ranks", "trip_miles", "trip_assigned", "trip_delivered", "departed_ranks", "delivered_ranks", "day_timeline")
+    
+    def __init__(self, times, ranks, trip_miles, trip_assigned, trip_delivered, departed_ranks, delivered_ranks, day_timeline):
+        self.times = tuple(times)
+        self.ranks = ranks
+        self.trip_miles = trip_miles
+        self.trip_assigned = trip_assigned
+        self.trip_delivered = trip_delivered
+        self.departed_ranks = departed_ranks
+        self.delivered_ranks = delivered_ranks
+        self.day_timeline = day_timeline
+        
+    # This method returns a SimulationResult object for each trip at the time
+    # with the provided index
+    # Big O: O(t) for t trips
+    def get_results(self, time_index):
+        hours_passed = self.times[time_index]
+        return [trip.create_result(hours_passed, assigned[time_index], miles[time_index], delivered[time_index])
+                for trip, assigned, miles, delivered in zip(self.day_timeline.truck_timelines, self.trip_assigned, self.trip_miles, self.trip_delivered)]
+                
+    # This method returns the number of miles each trip had traveled at the
+    # time with the provided index
+    # Big O: O(t) for t trips
+    def get_trip_miles(self, time_index):
+        return [miles[time_index] for miles in self.trip_miles]
+        
+    # This method returns a SimulationSnapshot of the time with the provided
+    # index, so a replay can be used anywhere a single time is expected
+    # Big O: O(n + t) for t trips
+    def get_snapshot(self, time_index):
+        return self.day_timeline.create_snapshot(self.times[time_index], self.get_results(time_index))
+        
+    # This method returns a SimulationSnapshot for each time, in the order the
+    # times were provided
+    # Big O: O(q*(n + t)) for t trips and q times
+    def iter_snapshots(self):
+        for time_index in range(len(self.times)):
+            yield self.get_snapshot(time_index)
+            
+    # This method returns the delivery status ID, delivery time, and carrier of
+    # a single package at the time with the provided index
+    # Big O: O(1)
+    def get_package_state(self, pkg_id, time_index):
+        day_timeline = self.day_timeline
+        if not day_timeline.package_rows.has_key(pkg_id):
+            return 0, None, None
+            
+        row = day_timeline.package_rows.get_val(pkg_id)
+        rank = self.ranks[time_index]
+        if rank < self.departed_ranks[row]:
+            return 0, None, None
+            
+        carrier = day_timeline.truck_timelines[day_timeline.row_trips[row]].truck_name
+        if rank < self.delivered_ranks[row]:
+            return 1, None, carrier
+            
+        return 2, day_timeline.delivery_times[row], carrier
+        
+    # This method returns the delivery status ID of a single package at every
+    # time, in the order the times were provided
+    # Big O: O(q) for q times
+    def get_package_statuses(self, pkg_id):
+        if not self.day_timeline.package_rows.has_key(pkg_id):
+            return bytes(len(self.times))
+            
+        row = self.day_timeline.package_rows.get_val(pkg_id)
+        departed_rank = self.departed_ranks[row]
+        delivered_rank = self.delivered_ranks[row]
+        return bytes(0 if rank < departed_rank else 1 if rank < delivered_rank else 2 for rank in self.ranks)
+        
+# The PackageLoad class represents a set of packages that will travel together.
+# It is used both for groups of packages that must be delivered together and for
+# the full load that a truck carries on a single trip
+class PackageLoad:
+    def __init__(self, package):
+        self.pkg_ids = [package.package_id]
+        self.address_id = package.address_id
+        self.ready_time = package.get_arrival_time()
+        self.deadline = package.get_deadline()
+        self.deadline_address_id = package.address_id
+        self.truck = package.get_required_truck()
+        
+    # This method adds all of the packages in another load to this one
+    # Big O: O(n)
+    def merge(self, other):
+        self.pkg_ids.extend(other.pkg_ids)
+        self.ready_time = max(self.ready_time, other.ready_time)
+        
+        if other.deadline < self.deadline:
+            self.deadline = other.deadline
+            self.deadline_address_id = other.deadline_address_id
+            
+        if self.truck is None:
+            self.truck = other.truck
+            
+        elif other.truck is not None and other.truck != self.truck:
+            raise ValueError(f"Packages {self.pkg_ids} must be delivered together but are restricted to different trucks")
+            
+    # This method returns true if the provided load can be added to this one
+    # without exceeding the capacity or breaking any restrictions
+    # Big O: O(1)
+    def can_merge(self, other, capacity, distance_table, speed):
+        if len(self.pkg_ids) + len(other.pkg_ids) > capacity:
+            return False
+            
+        if self.truck is not None and other.truck is not None and self.truck != other.truck:
+            return False
+            
+        # Packages with a deadline never wait at the hub for packages that
+        # arrive after them
+        if other.ready_time > self.ready_time and self.deadline < END_OF_DAY:
+            return False
+            
+        if self.ready_time > other.ready_time and other.deadline < END_OF_DAY:
+            return False
+            
+        # Neither load's packages can wait so long for the other's to arrive
+        # that they couldn't make their deadline even on the quickest trip
+        if other.ready_time + distance_table.get_min_travel_time(self.deadline_address_id, speed) > self.deadline:
+            return False
+            
+        if self.ready_time + distance_table.get_min_travel_time(other.deadline_address_id, speed) > other.deadline:
+            return False
+            
+        return True
+        
+# The LoadPlanner class divides a manifest of packages into truck loads and
+# decides which truck carries each load and when it departs. Loads are built by
+# clustering: each load starts from a seed package, and the packages near the
+# seed are added one by one in order of their cheapest insertion cost
+class LoadPlanner:
+    def __init__(self, num_trucks, num_drivers, truck_capacity, speed=TRUCK_SPEED, start_time=0, search_time=LOAD_SEARCH_TIME):
+        self.num_trucks = num_trucks
+        self.num_drivers = num_drivers
+        self.speed = speed
+        
+        # The capacity can be a single number for every truck, or a list with
+        # the capacity of each truck. Loads are built to fit the largest truck
+        if isinstance(truck_capacity, int):
+            truck_capacity = [truck_capacity]*num_trucks
+        self.truck_capacities = list(truck_capacity)
+        self.truck_capacity = max(self.truck_capacities, default=0)
+        
+        # No truck leaves the hub before start_time, in hours after 8:00AM
+        self.start_time = start_time
+        
+        # The number of nearby packages considered when filling each load
+        self.pool_size = max(32, 4*self.truck_capacity)
+        
+        # The number of seconds improve_loads() can spend on the loads
+        self.search_time = search_time
+        
+    # This method groups together the packages that must be delivered together.
+    # Every package ends up in exactly one group
+    # Big O: O(n)
+    def create_package_groups(self, package_table):
+        # Each package starts out in its own group, and groups are joined
+        # together using a union-find structure
+        parents = HashTable(len(package_table))
+        parents.bulk_insert((pkg_id, pkg_id) for pkg_id in package_table)
+        
+        def find(pkg_id):
+            root = pkg_id
+            while parents.get_val(root) != root:
+                root = parents.get_val(root)
+                
+            while pkg_id != root:
+                next_id = parents.get_val(pkg_id)
+                parents.insert_val(pkg_id, root)
+                pkg_id = next_id
+                
+            return root
+            
+        for package in package_table.values():
+            for other_id in package.get_delivered_with():
+                if not parents.has_key(other_id):
+                    raise ValueError(f"Package {package.package_id} must be delivered with unknown package {other_id}")
+                    
+                parents.insert_val(find(package.package_id), find(other_id))
+                
+        # Build a PackageLoad for each group of packages
+        groups = HashTable(len(package_table))
+        for pkg_id in sorted(package_table):
+            package = package_table.get_val(pkg_id)
+            new_load = PackageLoad(package)
+            root = find(pkg_id)
+            
+            if groups.has_key(root):
+                groups.get_val(root).merge(new_load)
+            else:
+                groups.insert_val(root, new_load)
+                
+        for group in groups.values():
+            if len(group.pkg_ids) > self.truck_capacity:
+                raise ValueError(f"Packages {group.pkg_ids} must be delivered together but don't fit on one truck")
+                
+            if group.truck is not None and group.truck >= self.num_trucks:
+                raise ValueError(f"Packages {group.pkg_ids} can only be on truck {group.truck + 1}, but there are only {self.num_trucks} trucks")
+                
+        return list(groups.values())
+        
+    # This method divides the packages into loads that each fit on one truck
+    # Big O: O(n^2/c + n*c) for truck capacity c
+    def create_loads(self, package_table, distance_table):
+        groups = self.create_package_groups(package_table)
+        
+        get_distance = distance_table.get_distance
+        hub_id = distance_table.get_hub_id()
+        hub_row = distance_table.get_row(hub_id)
+        
+        # Seeds are chosen starting with the packages that arrive at the hub
+        # last, since they can't join loads that leave before they arrive. Ties
+        # are broken by deadline, and then by distance from the hub so that the
+        # outlying packages anchor their own loads
+        seed_order = sorted(range(len(groups)), key=lambda i: (-groups[i].ready_time, groups[i].deadline, -hub_row[groups[i].address_id]))
+        unassigned = set(range(len(groups)))
+        loads = []
+        
+        for seed_index in seed_order:
+            if seed_index not in unassigned:
+                continue
+                
+            # The seed group becomes the start of a new load
+            unassigned.discard(seed_index)
+            seed = groups[seed_index]
+            load = seed
+            
+            # Only the packages closest to the seed are considered for this load
+            seed_row = distance_table.get_row(seed.address_id)
+            pool = heapq.nsmallest(self.pool_size, unassigned, key=lambda i: seed_row[groups[i].address_id])
+            
+            # The load's route is approximated as a tour from the hub through
+            # each of its addresses and back
+            tour = [hub_id, seed.address_id, hub_id]
+            
+            # insertions[k] is the (added miles, position) of the cheapest place
+            # to insert pool[k] into the tour. Inserting a stop only replaces
+            # one edge of the tour, so these are updated after each insertion
+            # rather than being found again from scratch. If the position is
+            # None, the group's cheapest edge was replaced and the added miles
+            # are only a lower bound, which is made exact if the group is chosen
+            insertions = [self.find_cheapest_position(groups[group_index].address_id, tour, get_distance) for group_index in pool]
+            
+            while pool and len(load.pkg_ids) < self.truck_capacity:
+                # Packages that arrive after the rest of the load would hold up
+                # the whole load, so the wait is counted as extra miles. Groups
+                # that can't join the load are given an infinite cost
+                delay_costs = [math.inf]*len(pool)
+                for k, group_index in enumerate(pool):
+                    group = groups[group_index]
+                    if load.can_merge(group, self.truck_capacity, distance_table, self.speed):
+                        delay_costs[k] = max(0, group.ready_time - load.ready_time)*self.speed*len(load.pkg_ids)
+                        
+                # The cheapest group is chosen, with ties going to the first one
+                # in the pool. The exact cost of a group can only be higher than
+                # its lower bound, so the choice is made again after one is found
+                costs = [insertion[0] + delay_cost for insertion, delay_cost in zip(insertions, delay_costs)]
+                while True:
+                    best_choice = min(range(len(pool)), key=costs.__getitem__)
+                    if costs[best_choice] == math.inf or insertions[best_choice][1] is not None:
+                        break
+                    insertions[best_choice] = self.find_cheapest_position(groups[pool[best_choice]].address_id, tour, get_distance)
+                    costs[best_choice] = insertions[best_choice][0] + delay_costs[best_choice]
+                    
+                if costs[best_choice] == math.inf:
+                    break
+                    
+                group_index = pool.pop(best_choice)
+                _, position = insertions.pop(best_choice)
+                unassigned.discard(group_index)
+                load.merge(groups[group_index])
+                
+                address_id = groups[group_index].address_id
+                tour.insert(position, address_id)
+                prev_id = tour[position - 1]
+                next_id = tour[position + 1]
+                to_new_leg = get_distance(prev_id, address_id)
+                from_new_leg = get_distance(address_id, next_id)
+                
+                # The edge from prev_id to next_id has been replaced by two new
+                # ones, so each group only has to compare its cheapest place
+                # against them. Every other edge costs at least as much as the
+                # cheapest one did, so a group whose cheapest edge was replaced
+                # keeps its old cost as a lower bound unless a new edge beats it
+                for k, group_index in enumerate(pool):
+                    insert_cost, insert_position = insertions[k]
+                    if insert_position == position:
+                        insert_position = None
+                    elif insert_position is not None and insert_position > position:
+                        insert_position += 1
+                        
+                    other_id = groups[group_index].address_id
+                    to_new = get_distance(other_id, address_id)
+                    new_insertion = min((get_distance(other_id, prev_id) + to_new - to_new_leg, position),
+                                        (to_new + get_distance(other_id, next_id) - from_new_leg, position + 1))
+                    
+                    if new_insertion[0] < insert_cost:
+                        insertions[k] = new_insertion
+                    elif insert_position is not None:
+                        insertions[k] = min((insert_cost, insert_position), new_insertion)
+                    else:
+                        insertions[k] = (insert_cost, None)
+                
+            loads.append(load)
+            
+        return loads
+        
+    # This method returns the (added miles, position) of the cheapest place to
+    # insert an address into a tour. Ties go to the earliest position
+    # Big O: O(t) for t stops in the tour
+    def find_cheapest_position(self, address_id, tour, get_distance):
+        to_tour = [get_distance(address_id, stop) for stop in tour]
+        return min((to_tour[i] + to_tour[i + 1] - get_distance(tour[i], tour[i + 1]), i + 1) for i in range(len(tour) - 1))
+        
+    # This method improves the loads made by create_loads() by moving groups of
+    # packages between the trips they were scheduled on. Two kinds of moves are
+    # tried for each group:
+    #   - relocate: the group joins another trip
+    #   - swap: the group trades places with a group on another trip
+    # Only the trips that deliver to one of the addresses nearest the group are
+    # tried. A move has to shorten the two trips it changes without making
+    # either of them late, and then the day is scheduled again to check that it
+    # drives fewer miles with no more late packages. The search stops once no
+    # move helps or time_budget seconds have passed, and returns the new loads
+    # Big O: O(g*k*c^3) per pass for g groups, k nearest addresses and truck capacity c, plus O(l*log l + n) for each move that's kept
+    def improve_loads(self, loads, package_table, distance_table, simulator, time_budget):
+        stop_time = time.perf_counter() + time_budget
+        pkg_groups = HashTable(len(package_table))
+        for group in self.create_package_groups(package_table):
+            pkg_groups.bulk_insert((pkg_id, group) for pkg_id in group.pkg_ids)
+            
+        trips = self.schedule_loads(loads, package_table, distance_table, simulator)
+        day_timeline = DayTimeline(trips)
+        total_miles = day_timeline.get_total_miles()
+        late_count = day_timeline.count_late_packages(package_table)
+        
+        improved = True
+        while improved and time.perf_counter() < stop_time:
+            improved = False
+            
+            # trip_groups[i] is the list of groups carried on trips[i]
+            trip_groups = []
+            for trip in trips:
+                groups = []
+                for pkg_id in trip.pkg_route:
+                    group = pkg_groups.get_val(pkg_id)
+                    if all(group is not other for other in groups):
+                        groups.append(group)
+                trip_groups.append(groups)
+                
+            for i, groups_i, j, groups_j in self.get_group_moves(trip_groups, package_table, distance_table):
+                if time.perf_counter() > stop_time:
+                    break
+                    
+                # The trip taking the group is checked first, since it's the one
+                # that's most often full
+                length_j = self.get_trip_length(groups_j, trips[j], package_table, distance_table, simulator)
+                if length_j is None:
+                    continue
+                    
+                length_i = self.get_trip_length(groups_i, trips[i], package_table, distance_table, simulator)
+                if length_i is None or length_i + length_j >= trips[i].route_length + trips[j].route_length - 1e-9:
+                    continue
+                    
+                new_groups = [groups_i if index == i else groups_j if index == j else groups for index, groups in enumerate(trip_groups)]
+                new_loads = [self.combine_groups(groups, package_table) for groups in new_groups if groups]
+                new_trips = self.schedule_loads(new_loads, package_table, distance_table, simulator)
+                day_timeline = DayTimeline(new_trips)
+                new_miles = day_timeline.get_total_miles()
+                new_late_count = day_timeline.count_late_packages(package_table)
+                
+                if new_miles < total_miles - 1e-9 and new_late_count <= late_count:
+                    loads, trips, total_miles, late_count = new_loads, new_trips, new_miles, new_late_count
+                    improved = True
+                    break
+                    
+        return loads
+        
+    # This method lists the moves tried by improve_loads(), as tuples of the two
+    # trips changed and the groups each of them would carry after the move
+    # Big O: O(g*k*c) for g groups, k nearest addresses and truck capacity c
+    def get_group_moves(self, trip_groups, package_table, distance_table):
+        # address_trips maps each address to the trips that deliver to it
+        address_trips = HashTable(len(trip_groups))
+        for index, groups in enumerate(trip_groups):
+            for group in groups:
+                for pkg_id in group.pkg_ids:
+                    address_id = package_table.get_val(pkg_id).address_id
+                    if not address_trips.has_key(address_id):
+                        address_trips.insert_val(address_id, [])
+                    near_trips = address_trips.get_val(address_id)
+                    if not near_trips or near_trips[-1] != index:
+                        near_trips.append(index)
+                        
+        for i, groups in enumerate(trip_groups):
+            for group in groups:
+                near_trips = set()
+                for pkg_id in group.pkg_ids:
+                    for address_id in distance_table.get_nearest_addresses(package_table.get_val(pkg_id).address_id):
+                        if address_trips.has_key(address_id):
+                            near_trips.update(address_trips.get_val(address_id))
+                near_trips.discard(i)
+                
+                rest_i = [other for other in groups if other is not group]
+                for j in sorted(near_trips):
+                    yield i, rest_i, j, trip_groups[j] + [group]
+                    for other in trip_groups[j]:
+                        yield i, rest_i + [other], j, [kept for kept in trip_groups[j] if kept is not other] + [group]
+                        
+    # This method returns the length of the route a trip would drive if it
+    # carried the provided groups instead of its own, or None if they don't fit
+    # on its truck, haven't arrived by the time it leaves, or one of them would
+    # be late. A trip with no groups doesn't drive at all
+    # Big O: O(c^2) for truck capacity c, or O(c) if the route is cached
+    def get_trip_length(self, groups, trip, package_table, distance_table, simulator):
+        pkg_ids = [pkg_id for group in groups for pkg_id in group.pkg_ids]
+        if not pkg_ids:
+            return 0
+            
+        if len(pkg_ids) > self.truck_capacities[trip.truck_index]:
+            return None
+            
+        if any((group.truck is not None and group.truck != trip.truck_index) or group.ready_time > trip.departure_time for group in groups):
+            return None
+            
+        pkg_route, distance_list = simulator.get_delivery_route(package_table, distance_table, pkg_ids, trip.departure_time)
+        if simulator.find_late_package(package_table, distance_table, pkg_route, trip.departure_time, True) is not None:
+            return None
+            
+        return sum(distance_list)
+        
+    # This method joins groups of packages together into a single new load,
+    # leaving the groups themselves unchanged
+    # Big O: O(n)
+    def combine_groups(self, groups, package_table):
+        pkg_ids = [pkg_id for group in groups for pkg_id in group.pkg_ids]
+        load = PackageLoad(package_table.get_val(pkg_ids[0]))
+        for pkg_id in pkg_ids[1:]:
+            load.merge(PackageLoad(package_table.get_val(pkg_id)))
+            
+        return load
+        
+    # This method creates the loads for the packages, improves them and
+    # schedules them on the trucks. It returns a DayTimeline object containing
+    # the planned trips
+    # Big O: O(n^2/c + n*c + (n/c)*log(n/c)) for truck capacity c, not including improve_loads()
+    def plan_day(self, package_table, distance_table, simulator, improve_time=None):
+        loads = self.create_loads(package_table, distance_table)
+        if self.search_time:
+            loads = self.improve_loads(loads, package_table, distance_table, simulator, self.search_time)
+        return DayTimeline(self.schedule_loads(loads, package_table, distance_table, simulator, improve_time))
+        
+    # This method schedules the loads on the trucks using a discrete event
+    # simulation of the hub. Events are kept in a priority queue ordered by
+    # time, and there are two kinds:
+    #   - LOAD_READY: the last package of a load has arrived at the hub
+    #   - TRIP_RETURN: a truck and its driver have returned to the hub
+    # After all the events at a given time have been handled, loads that are
+    # ready are sent out, earliest deadline first, for as long as there is a
+    # free driver and a free truck that can take them. A driver can leave on a
+    # different truck than the one they returned on, which is a handoff. Only
+    # the times that something happens at the hub are simulated, since each
+    # trip's stops are already recorded in its TruckTimeline
+    # Big O: O(l*log l + l*(t + d)) for l loads, t trucks and d drivers
+    def schedule_loads(self, loads, package_table, distance_table, simulator, improve_time=None):
+        if loads and (self.num_trucks < 1 or self.num_drivers < 1):
+            raise ValueError("At least one truck and one driver are needed to deliver the packages")
+            
+        for load in loads:
+            trucks = [load.truck] if load.truck is not None else range(self.num_trucks)
+            if all(self.truck_capacities[truck] < len(load.pkg_ids) for truck in trucks):
+                raise ValueError(f"Packages {load.pkg_ids} must be delivered together but don't fit on any truck that can take them")
+                
+        # Each event is a (time, sequence number, kind, index) tuple. The
+        # sequence number keeps events at the same time in the order they were
+        # added, and index is the load or trip the event is about
+        events = []
+        sequence = itertools.count()
+        for load_index, load in enumerate(loads):
+            heapq.heappush(events, (max(load.ready_time, self.start_time), next(sequence), LOAD_READY, load_index))
+            
+        # For every truck and driver we keep track of when they were last freed,
+        # the last trip they went on, and for drivers, the truck they were on
+        free_trucks = list(range(self.num_trucks))
+        free_drivers = list(range(self.num_drivers))
+        truck_trips = [None]*self.num_trucks
+        trip_counts = [0]*self.num_trucks
+        driver_trips = [None]*self.num_drivers
+        driver_trucks = [None]*self.num_drivers
+        driver_free_times = [self.start_time]*self.num_drivers
+        
+        # Ready loads wait in a priority queue of (deadline, ready time, index).
+        # waiting_for[t] counts the ready loads that can only go on truck t, so
+        # other loads can be steered away from it
+        ready_loads = []
+        waiting_for = [0]*self.num_trucks
+        truck_timelines = []
+        trip_assignments = []
+        
+        while events:
+            current_time = events[0][0]
+            while events and events[0][0] == current_time:
+                _, _, kind, index = heapq.heappop(events)
+                
+                if kind == LOAD_READY:
+                    load = loads[index]
+                    heapq.heappush(ready_loads, (load.deadline, load.ready_time, index))
+                    if load.truck is not None:
+                        waiting_for[load.truck] += 1
+                        
+                elif kind == TRIP_RETURN:
+                    truck, driver = trip_assignments[index]
+                    free_trucks.append(truck)
+                    free_drivers.append(driver)
+                    driver_free_times[driver] = current_time
+                    
+            # Send out as many of the ready loads as possible. Loads that can't go
+            # on any of the free trucks are set aside until the next event
+            set_aside = []
+            while ready_loads and free_trucks and free_drivers:
+                entry = heapq.heappop(ready_loads)
+                load = loads[entry[2]]
+                trucks = [truck for truck in free_trucks if (load.truck is None or truck == load.truck) and self.truck_capacities[truck] >= len(load.pkg_ids)]
+                if not trucks:
+                    set_aside.append(entry)
+                    continue
+                    
+                # Trucks that a waiting load is restricted to are used last, and
+                # drivers stay on the truck they came back on where possible
+                if load.truck is not None:
+                    waiting_for[load.truck] -= 1
+                truck = min(trucks, key=lambda index: (waiting_for[index] > 0, index))
+                driver = min(free_drivers, key=lambda index: (driver_trucks[index] != truck, driver_free_times[index], index))
+                free_trucks.remove(truck)
+                free_drivers.remove(driver)
+                
+                trip_counts[truck] += 1
+                truck_name = get_truck_name(truck, trip_counts[truck])
+                
+                # The trip can't start until both the truck and the driver are back
+                # from their previous trips
+                follows = [trip for trip in (truck_trips[truck], driver_trips[driver]) if trip is not None]
+                if len(follows) == 2 and follows[0] is follows[1]:
+                    follows.pop()
+                    
+                timeline = simulator.create_truck_timeline(truck_name, package_table, distance_table, load.pkg_ids, current_time, follows, improve_time,
+                                                           max(load.ready_time, self.start_time), truck, driver)
+                heapq.heappush(events, (timeline.end_time, next(sequence), TRIP_RETURN, len(truck_timelines)))
+                truck_timelines.append(timeline)
+                trip_assignments.append((truck, driver))
+                
+                truck_trips[truck] = driver_trips[driver] = timeline
+                driver_trucks[driver] = truck
+                
+            for entry in set_aside:
+                heapq.heappush(ready_loads, entry)
+                
+        return truck_timelines
+        
+# The RouteRepairer class applies changes made during the day to an existing
+# DayTimeline: a package that arrives late, a corrected address, or a package
+# that's pulled from delivery. Instead of planning every route again, only the
+# part of the affected trip the truck hasn't driven yet is changed, using the
+# cheapest place to insert or remove a stop. Trips that follow the changed
+# trip are moved if it now returns to the hub at a different time. Each change
+# returns a new DayTimeline and leaves the trips of the old one untouched, so
+# queries that are already using the old plan aren't affected. The package
+# table is changed in place, though, so it always describes the newest plan. A
+# package removed from it can no longer be looked up through the old plan
+class RouteRepairer:
+    def __init__(self, truck_capacity=TRUCK_CAPACITY, num_trucks=NUM_TRUCKS, num_drivers=NUM_DRIVERS):
+        # The capacity can be a single number for every truck, or a list with
+        # the capacity of each truck, the same as for the LoadPlanner
+        self.truck_capacity = truck_capacity
+        self.num_trucks = num_trucks
+        self.num_drivers = num_drivers
+        
+    # This method returns the number of packages that fit on the truck with the
+    # provided index
+    # Big O: O(1)
+    def get_truck_capacity(self, truck_index):
+        if isinstance(self.truck_capacity, int):
+            return self.truck_capacity
+            
+        return self.truck_capacity[truck_index]
+        
+    # This method adds a new package to the package table and to the trip it
+    # is cheapest to add it to. Only trips that haven't left the hub by the
+    # provided time and that leave after the package arrives can take it. Trips
+    # where no other package would become late are chosen over ones where some
+    # would, then the trip with the fewest extra miles is chosen. If none of
+    # them have room, a new trip is made for the package with the first truck
+    # and driver that are free once it's ready
+    # Big O: O(n) for n packages in the day
+    def add_package(self, day_timeline, package_table, distance_table, package, hours_passed):
+        if package_table.has_key(package.package_id):
+            raise ValueError(f"Package {package.package_id} already exists")
+            
+        required_truck = package.get_required_truck()
+        ready_time = max(hours_passed, package.get_arrival_time())
+        best_trip = None
+        best_insertion = None
+        
+        for trip in day_timeline.truck_timelines:
+            if trip.departure_time is None or trip.departure_time < ready_time or trip.get_distance_traveled(hours_passed) > 0:
+                continue
+                
+            if len(trip.pkg_route) >= self.get_truck_capacity(trip.truck_index) or (required_truck is not None and trip.truck_index != required_truck):
+                continue
+                
+            insertion = self.find_cheapest_insertion(trip, 0, package, package_table, distance_table)
+            if best_insertion is None or insertion[:2] < best_insertion[:2]:
+                best_trip, best_insertion = trip, insertion
+                
+        if best_trip is None:
+            new_trip = self.create_trip(day_timeline, distance_table, package, ready_time)
+            if new_trip is None:
+                raise ValueError(f"No trip leaving after {float_to_time(ready_time, 8)} has room for package {package.package_id} and no truck is free to take it")
+                
+            package_table.insert_val(package.package_id, package)
+            return DayTimeline(day_timeline.truck_timelines + [new_trip])
+            
+        package_table.insert_val(package.package_id, package)
+        new_trip = self.insert_stop(best_trip, best_insertion[2], package.package_id, package_table, distance_table)
+        return self.replace_trip(day_timeline, best_trip, new_trip)
+        
+    # This method gives a package a new address. If the package is still on a
+    # trip that the truck hasn't finished, its stop is moved to the cheapest
+    # place in the part of the route that hasn't been driven yet
+    # Big O: O(n) for n packages in the day
+    def change_address(self, day_timeline, package_table, distance_table, pkg_id, address, hours_passed, city=None, state=None, zipcode=None):
+        old_package = package_table.get_val(pkg_id)
+        new_package = Package(pkg_id, address, city or old_package.city, state or old_package.state, zipcode or old_package.zipcode, old_package.deadline,
+                              old_package.mass, old_package.arrival_time, old_package.notes, distance_table.get_address_id(address))
+        
+        if not day_timeline.package_rows.has_key(pkg_id):
+            package_table.insert_val(pkg_id, new_package)
+            return day_timeline
+            
+        trip, index = day_timeline.get_package_position(pkg_id)
+        num_locked = self.get_locked_stops(trip, hours_passed)
+        if index < num_locked:
+            raise ValueError(f"Package {pkg_id} has already been delivered or is about to be")
+            
+        # The stop is removed while the old address is still in the table,
+        # then put back at the best place for the new address
+        removed_trip = self.remove_stop(trip, index, package_table, distance_table)
+        package_table.insert_val(pkg_id, new_package)
+        insertion = self.find_cheapest_insertion(removed_trip, num_locked, new_package, package_table, distance_table)
+        new_trip = self.insert_stop(removed_trip, insertion[2], pkg_id, package_table, distance_table)
+        return self.replace_trip(day_timeline, trip, new_trip)
+        
+    # This method removes a package from the package table and takes its stop
+    # out of its trip, joining the stops on either side of it
+    # Big O: O(n) for n packages in the day
+    def remove_package(self, day_timeline, package_table, distance_table, pkg_id, hours_passed):
+        if not day_timeline.package_rows.has_key(pkg_id):
+            package_table.delete_val(pkg_id)
+            return day_timeline
+            
+        trip, index = day_timeline.get_package_position(pkg_id)
+        if index < self.get_locked_stops(trip, hours_passed):
+            raise ValueError(f"Package {pkg_id} has already been delivered or is about to be")
+            
+        new_trip = self.remove_stop(trip, index, package_table, distance_table)
+        package_table.delete_val(pkg_id)
+        return self.replace_trip(day_timeline, trip, new_trip)
+        
+    # This method returns a new trip that delivers just the provided package,
+    # using the truck and driver that can leave soonest after ready_time. A
+    # truck or driver is free once the last trip they're on returns, so the new
+    # trip follows those trips. Returns None if the package can't go on any
+    # truck, or every truck or driver is on a trip that's still waiting to leave
+    # Big O: O(t + k*d) for t trips, k trucks and d drivers
+    def create_trip(self, day_timeline, distance_table, package, ready_time):
+        truck_trips = [None]*self.num_trucks
+        trip_counts = [0]*self.num_trucks
+        driver_trips = [None]*self.num_drivers
+        for trip in day_timeline.truck_timelines:
+            if trip.truck_index is not None:
+                truck_trips[trip.truck_index] = trip
+                trip_counts[trip.truck_index] += 1
+            if trip.driver_index is not None:
+                driver_trips[trip.driver_index] = trip
+            
+        # A trip that hasn't been given a departure time yet doesn't have an
+        # end time either, so its truck and driver are never free
+        required_truck = package.get_required_truck()
+        free_times = [[trip.end_time if trip is not None else 0 for trip in trips] for trips in (truck_trips, driver_trips)]
+        trucks = [truck for truck in range(self.num_trucks) if free_times[0][truck] is not None and self.get_truck_capacity(truck) > 0
+                  and (required_truck is None or truck == required_truck)]
+        drivers = [driver for driver in range(self.num_drivers) if free_times[1][driver] is not None]
+        if not trucks or not drivers:
+            return None
+            
+        truck = min(trucks, key=lambda index: (free_times[0][index], index))
+        driver = min(drivers, key=lambda index: (free_times[1][index], index))
+        follows = [trip for trip in (truck_trips[truck], driver_trips[driver]) if trip is not None]
+        if len(follows) == 2 and follows[0] is follows[1]:
+            follows.pop()
+            
+        hub_id = distance_table.get_hub_id()
+        distance = distance_table.get_distance(hub_id, package.address_id)
+        leg_classes = None
+        if distance_table.speed_profile is not None:
+            leg_classes = [distance_table.get_speed_class(hub_id, package.address_id), distance_table.get_speed_class(package.address_id, hub_id)]
             
-        return time_to_float(self.deadline, "%I:%M %p") - 8
+        speed = day_timeline.truck_timelines[0].speed if day_timeline.truck_timelines else TRUCK_SPEED
+        departure_time = max([ready_time] + [trip.end_time for trip in follows])
+        return TruckTimeline(get_truck_name(truck, trip_counts[truck] + 1), [package.package_id], [distance, distance], departure_time, follows, speed,
+                             ready_time, truck, driver, distance_table.speed_profile, leg_classes)
         
-    # This method converts this package's arrival time to a float and returns it
-    # Big O: O(1)
-    def get_arrival_time(self):
-        if self.arrival_time == "BOD":
+    # This method returns the number of stops at the start of a trip's route
+    # that can't be changed at the provided time: the ones already delivered
+    # and the one the truck is currently driving to
+    # Big O: O(log n)
+    def get_locked_stops(self, trip, hours_passed):
+        distance_traveled = trip.get_distance_traveled(hours_passed)
+        if distance_traveled == 0:
             return 0
             
-        return time_to_float(self.arrival_time, "%I:%M %p") - 8
-   
-# The Simulator class is used to simulate our trucks on their deliveries and
-# record all the information
-class Simulator:
-    def __init__(self):
-        pass
-    
-    # This method takes a list of delivery parameters including a list of packages,
-    # a number of hours passed, and a departure time, and simulates a delivery
-    # with those parameters. It then returns a SimulationResult object that
-    # details the outcome of the simulation
-    # Big O: O(n^2)
-    def simulate_delivery(self, truck_name, package_table, distance_table, package_list, departure_time, hours_passed):
-        # First we evaluate an efficient order to deliver the packages in
-        pkg_route, distance_list = self.calculate_delivery_route(package_table, distance_table, package_list)
-        route_length = sum(distance_list)
-        
-        # This is the speed of the truck in miles/hour
-        speed = 18
-        
-        # If a departure time was provided, the calculate the distance the truck
-        # was able to travel in the amount of time specified, as well as the
-        # time their route ended
-        if departure_time is not None:
-            distance_traveled = max(0, min(route_length, speed*(hours_passed - departure_time)))
-            time_ended = distance_traveled/speed + departure_time
-            distance_traveled = distance_traveled
-        
-        # If a departure time was not provided, then the truck will not travel
-        # anywhere, and we set its distance to 0
-        else:
-            distance_traveled = 0
-            time_ended = 0
+        return min(trip.get_total_delivered(distance_traveled) + 1, len(trip.pkg_route))
         
-        # Evaluate the status of each package given the number of miles traveled
-        total_delivered = 0
-        for index, pkg_id in enumerate(pkg_route):
-            the_package = package_table.get_val(pkg_id)
+    # This method finds the cheapest place to insert a package into a trip's
+    # route, at or after the provided position. Each place costs the miles it
+    # adds, and a place is on time if the package makes its deadline and no
+    # package that was on time is made late. Finding the smallest slack left
+    # after every position first means each place can be checked in O(1).
+    # Returns a tuple of (0 if on time else 1, added miles, position)
+    # Big O: O(n)
+    def find_cheapest_insertion(self, trip, start_index, package, package_table, distance_table):
+        pkg_route = trip.pkg_route
+        hub_id = distance_table.get_hub_id()
+        address_ids = [hub_id] + [package_table.get_val(pkg_id).address_id for pkg_id in pkg_route] + [hub_id]
+        
+        # slack[i] is how many hours the stops from position i onward can be
+        # delayed by before a package that's currently on time becomes late
+        slack = [math.inf]*(len(pkg_route) + 1)
+        for index in range(len(pkg_route) - 1 if trip.departure_time is not None else -1, start_index - 1, -1):
+            deadline = package_table.get_val(pkg_route[index]).get_deadline()
+            delivery_time = trip.delivery_times[index]
+            slack[index] = min(slack[index + 1], deadline - delivery_time if delivery_time <= deadline else math.inf)
             
-            # Calculate the number of miles necessary to have delivered this
-            # package
-            miles_necessary = sum(distance_list[:index + 1])
+        best_insertion = None
+        for position in range(start_index, len(pkg_route) + 1):
+            prev_id = address_ids[position]
+            next_id = address_ids[position + 1]
+            to_package = distance_table.get_distance(prev_id, package.address_id)
+            added_miles = to_package + distance_table.get_distance(package.address_id, next_id) - distance_table.get_distance(prev_id, next_id)
             
-            # If distance_traveled == 0, then the package hasn't left the hub
-            if distance_traveled == 0:
-                the_package.delivery_status = 0
-                
-            # If distance_travled < miles_necessary, then the package is in 
-            # transit
-            elif distance_traveled < miles_necessary:
-                the_package.delivery_status = 1
-                the_package.carrier = truck_name
+            # A trip without a departure time can't make any package late yet.
+            # With a SpeedProfile, the delay is measured at the next stop, and
+            # the stops after it are assumed to be held up by the same amount
+            on_time = True
+            if trip.departure_time is not None and trip.speed_profile is None:
+                miles_before = trip.cumulative_miles[position - 1] if position > 0 else 0
+                arrival_time = (miles_before + to_package)/trip.speed + trip.departure_time
+                on_time = arrival_time <= package.get_deadline() and added_miles/trip.speed <= slack[position]
+            elif trip.departure_time is not None:
+                leg_start = trip.leg_end_times[position - 1] if position > 0 else trip.departure_time
+                arrival_time = leg_start + distance_table.get_travel_time(prev_id, package.address_id, leg_start, trip.speed)
+                next_arrival = arrival_time + distance_table.get_travel_time(package.address_id, next_id, arrival_time, trip.speed)
+                on_time = arrival_time <= package.get_deadline() and next_arrival - trip.leg_end_times[position] <= slack[position]
+            
+            insertion = (0 if on_time else 1, added_miles, position)
+            if best_insertion is None or insertion < best_insertion:
+                best_insertion = insertion
                 
-            # Otherwise, the package has been delivered
-            else:
-                the_package.delivery_status = 2
-                the_package.delivery_time = miles_necessary/speed + departure_time 
-                the_package.carrier = truck_name    
-                total_delivered += 1
+        return best_insertion
         
-        # Gather all of the information into a SimulationResult object and 
-        # return it
-        return SimulationResult(truck_name, departure_time, hours_passed, time_ended, distance_traveled, route_length, len(package_list), total_delivered)
+    # This method returns a copy of a trip with a package inserted into its
+    # route at the provided position
+    # Big O: O(n)
+    def insert_stop(self, trip, position, pkg_id, package_table, distance_table):
+        pkg_route = trip.pkg_route
+        hub_id = distance_table.get_hub_id()
+        prev_id = package_table.get_val(pkg_route[position - 1]).address_id if position > 0 else hub_id
+        next_id = package_table.get_val(pkg_route[position]).address_id if position < len(pkg_route) else hub_id
+        address_id = package_table.get_val(pkg_id).address_id
         
-    # This method uses a greedy algorithm to determine a good order
-    # to deliver a given list of packages in. At every step, it simply
-    # choses the closest package to the current address, prioritizing packages
-    # that have a delivery deadline
-    # Big O: O(n^2)
-    def calculate_delivery_route(self, package_table, distance_table, package_list):
-        optimal_route = []
-        distance_list = []
+        new_route = pkg_route[:position] + [pkg_id] + pkg_route[position:]
+        new_distances = trip.distance_list[:position] + [distance_table.get_distance(prev_id, address_id), distance_table.get_distance(address_id, next_id)] + trip.distance_list[position + 1:]
+        new_classes = None
+        if trip.leg_classes is not None:
+            new_classes = trip.leg_classes[:position] + [distance_table.get_speed_class(prev_id, address_id), distance_table.get_speed_class(address_id, next_id)] + trip.leg_classes[position + 1:]
+        return self.copy_trip(trip, new_route, new_distances, trip.departure_time, trip.follows, new_classes)
         
-        # Loop until all packages have been placed into the route
-        while len(optimal_route) != len(package_list):
-            best_package = None
-            best_distance = 10000
-            best_deadline = 100
-            
-            for pkg_id in package_list:
-                # Skip past packages that are already in the route
-                if pkg_id in optimal_route:
-                    continue
-                    
-                # Get the distance from the current point to this package
-                if optimal_route:
-                    distance = get_package_distance(package_table, distance_table, optimal_route[-1], pkg_id)
-                else:
-                    distance = get_distance_from_hub(package_table, distance_table, pkg_id)
-                    
-                # If the distance between the current point and this package are 0,
-                # that means we can deliver it immediately with no issues
-                if distance == 0:
-                    best_package = pkg_id
-                    best_distance = distance
-                    break
-                    
-                # Find the current package's deadline
-                deadline = package_table.get_val(pkg_id).get_deadline()
-                
-                # If this package's deadline is later than the current
-                # best_package's deadline, then we skip this package
-                if deadline > best_deadline:
-                    continue
-                    
-                # If this package's deadline is earlier than the current
-                # best_package's deadline, and the current best_package isn'table
-                # close by, then we'll prioritize this package
-                if deadline < best_deadline and best_distance > 1:
-                    best_package = pkg_id
-                    best_distance = distance
-                    best_deadline = deadline
-                    continue
-                    
-                # Prioritize packages that are closest to the most recent package
-                if distance < best_distance:
-                    best_package = pkg_id
-                    best_distance = distance
-                    best_deadline = deadline
-                    
-            optimal_route.append(best_package)
-            distance_list.append(best_distance) 
+    # This method returns a copy of a trip with the package at the provided
+    # position removed from its route
+    # Big O: O(n)
+    def remove_stop(self, trip, position, package_table, distance_table):
+        pkg_route = trip.pkg_route
+        hub_id = distance_table.get_hub_id()
+        prev_id = package_table.get_val(pkg_route[position - 1]).address_id if position > 0 else hub_id
+        next_id = package_table.get_val(pkg_route[position + 1]).address_id if position + 1 < len(pkg_route) else hub_id
         
-        # Add the distance needed to travel from the final point back to the hub
-        distance_list.append(get_distance_from_hub(package_table, distance_table, optimal_route[-1]))
+        new_route = pkg_route[:position] + pkg_route[position + 1:]
+        new_distances = trip.distance_list[:position] + [distance_table.get_distance(prev_id, next_id)] + trip.distance_list[position + 2:]
+        new_classes = None
+        if trip.leg_classes is not None:
+            new_classes = trip.leg_classes[:position] + [distance_table.get_speed_class(prev_id, next_id)] + trip.leg_classes[position + 2:]
+        return self.copy_trip(trip, new_route, new_distances, trip.departure_time, trip.follows, new_classes)
+        
+    # This method returns a new TruckTimeline with the same truck, driver,
+    # ready time, and SpeedProfile as the provided one, but with the provided
+    # route and departure
+    # Big O: O(n)
+    def copy_trip(self, trip, pkg_route, distance_list, departure_time, follows, leg_classes):
+        return TruckTimeline(trip.truck_name, pkg_route, distance_list, departure_time, follows, trip.speed, trip.ready_time, trip.truck_index,
+                             trip.driver_index, trip.speed_profile, leg_classes)
+        
+    # This method returns a new DayTimeline with one trip swapped for another.
+    # Every trip that has to wait for a changed trip is moved to leave when the
+    # trips it follows now return, but never before its own ready time
+    # Big O: O(n) for n packages in the day
+    def replace_trip(self, day_timeline, old_trip, new_trip):
+        replaced = HashTable(len(day_timeline.truck_timelines))
+        replaced.insert_val(old_trip, new_trip)
+        truck_timelines = []
+        
+        for trip in day_timeline.truck_timelines:
+            if replaced.has_key(trip):
+                truck_timelines.append(replaced.get_val(trip))
+                continue
+                
+            if not any(replaced.has_key(previous) for previous in trip.follows):
+                truck_timelines.append(trip)
+                continue
+                
+            follows = [replaced.get_val(previous) if replaced.has_key(previous) else previous for previous in trip.follows]
+            end_times = [previous.end_time for previous in follows]
+            departure_time = None if None in end_times else max([trip.ready_time] + end_times)
+            moved_trip = self.copy_trip(trip, trip.pkg_route, trip.distance_list, departure_time, follows, trip.leg_classes)
+            
+            replaced.insert_val(trip, moved_trip)
+            truck_timelines.append(moved_trip)
+            
+        return DayTimeline(truck_timelines)
         
-        return optimal_route, distance_list
-    
 # This class represents the result of the Simulator.simulate_delivery() method.
 # It details how the delivery went, including time spent, distance traveled, and
 # number of packages delivered
@@ -307,17 +2610,74 @@ class SimulationResult:
             
         return "Route in progress"    
         
+# The Scenario class describes one variation of the day to be evaluated by a
+# scenario sweep: how fast the trucks go, when they can first leave, how many
+# trucks and drivers there are, and how many packages fit on each truck
+class Scenario:
+    def __init__(self, speed, start_time, num_trucks, num_drivers, truck_capacity):
+        self.speed = speed
+        self.start_time = start_time
+        self.num_trucks = num_trucks
+        self.num_drivers = num_drivers
+        self.truck_capacity = truck_capacity
+        
+# The ScenarioResult class holds the outcome of evaluating a single Scenario.
+# If the scenario couldn't be planned, error explains why
+class ScenarioResult:
+    def __init__(self, scenario, total_miles, num_late, time_completed, error=None):
+        self.scenario = scenario
+        self.total_miles = total_miles
+        self.num_late = num_late
+        self.time_completed = time_completed
+        self.error = error
+        
+# This function returns the name of a truck given its index and which trip it
+# is on. Example: 0, 1 -> Truck A, 1, 2 -> Truck B-2, 27, 1 -> Truck AB
+# Big O: O(log n)
+def get_truck_name(truck_index, trip_number):
+    letters = ""
+    truck_index += 1
+    while truck_index > 0:
+        truck_index, remainder = divmod(truck_index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+        
+    if trip_number > 1:
+        return f"Truck {letters}-{trip_number}"
+        
+    return f"Truck {letters}"
+    
 # This function takes a float and a number of hours to add on and returns a 
-# string formatted in the standard HH:MMam/pm format.
+# string formatted in the standard HH:MMam/pm format. The time is rounded to
+# the nearest minute, since times like 65/60 can't be stored exactly and would
+# otherwise be shown a minute early
 # Example: 8.5, 2 -> 10:30am
 # Big O: O(1)
 def float_to_time(float_time, add_hours):
-    hours = math.floor(float_time)
-    minutes = math.floor((float_time - hours)*60)
+    hours, minutes = divmod(round(float_time*60), 60)
+    hours = (hours + add_hours) % 24
+    
+    suffix = "AM" if hours < 12 else "PM"
+    return f"{hours % 12 or 12:02d}:{minutes:02d}{suffix}"
+    
+# This function takes a time string in the HH:MM AM/PM format, with or without
+# the space, and converts it to a number of minutes after midnight. It is used
+# instead of strptime when loading packages since it's much faster
+# Example: "10:30 AM" -> 630
+# Big O: O(1)
+def time_to_minutes(string_time):
+    clock = string_time.replace(" ", "").upper()
+    suffix = clock[-2:]
+    hours, _, minutes = clock[:-2].partition(":")
     
-    h24_string = datetime.datetime.strptime(f"{hours + add_hours}:{minutes}", "%H:%M")
-    h12_string = h24_string.strftime("%I:%M%p")
-    return h12_string
+    if suffix not in ("AM", "PM") or not hours.isdigit() or not minutes.isdigit() or len(minutes) != 2:
+        raise ValueError(f"Time '{string_time}' is not in the format 'hh:mm AM' or 'hh:mm PM'")
+        
+    hours = int(hours)
+    minutes = int(minutes)
+    if not 1 <= hours <= 12 or minutes >= 60:
+        raise ValueError(f"Time '{string_time}' is not in the format 'hh:mm AM' or 'hh:mm PM'")
+        
+    return (hours % 12 + (12 if suffix == "PM" else 0))*60 + minutes
     
 # This function takes a time string and a parse format and converts it to a
 # float. Example: 10:30am, "%I:%M%p" -> 10.5
@@ -326,155 +2686,816 @@ def time_to_float(string_time, parse_format):
     timestamp = datetime.datetime.strptime(string_time, parse_format)
     return timestamp.hour + timestamp.minute/60
     
-# This function loads the distances.csv file as a list of lists so it can be
-# used to the create the distance table
-# Big O: O(n)  
-def load_distance_data():
-    distances_path = "distances.csv"
-
-    with open(distances_path) as f:
-        return [x for x in csv.reader(f)]
-
-# This function loads the packages.csv file as a list of lists so it can be used
-# to create the package table
+# This function streams the rows of the distances.csv file one at a time so
+# they can be used to create the distance table without holding the whole
+# file in memory
 # Big O: O(n)
-def load_package_data():
-    packages_path = "packages.csv"
+def load_distance_data(distances_path="distances.csv"):
+    with open(distances_path, newline="") as f:
+        yield from csv.reader(f)
 
-    with open(packages_path) as f:
-        return [x for x in csv.reader(f)][1:]
+# This function streams the rows of the packages.csv file one at a time, skipping
+# the header row, so they can be used to create the package table
+# Big O: O(n)
+def load_package_data(packages_path="packages.csv"):
+    with open(packages_path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
     
-# This function reads the data pulled from the distances.csv file and uses it to
-# create a table that can be used to quickly find the distance between any two addresses
+# This function reads the rows pulled from the distances.csv file and uses them
+# to create a table that can be used to quickly find the distance between any
+# two addresses. The table is filled in as the rows are read.
+# Any row or cell that can't be used is skipped and recorded in malformed_rows
+# as a (row number, reason) pair, with the header being row 0. The typecode and
+# matrix_path are passed on to the DistanceTable to choose how it's stored
 # Big O: O(n^2)
-def create_distance_hashtable(distance_data):
-    # Create a table with an initial size equal to the number of
-    # columns in our csv file
-    table_size = len(distance_data[0])
-    distance_table = HashTable(table_size)
-    
-    # Iterate through the top cell in each column in our csv file (A1, B1, etc).
-    # For each of these cells, we check its value. If its value is empty, we
-    # ignore it. If it isn't, then we add the value as a key to the distance
-    # table. The key will have its corresponding value set to another empty
-    # hash table    
-    for address in distance_data[0]:
-        if not address:
-            continue
+def create_distance_hashtable(distance_data, malformed_rows=None, typecode="d", matrix_path=None):
+    if malformed_rows is None:
+        malformed_rows = []
         
-        distance_table.insert_val(address, HashTable(table_size))
+    rows = iter(distance_data)
+    
+    # The top cell in each column in our csv file (B1, C1, etc) is an address.
+    # Each of these addresses is given an integer ID equal to its position, so
+    # the address in column B is ID 0, column C is ID 1, and so on
+    distance_table = DistanceTable((address for address in next(rows, []) if address), None, typecode, matrix_path)
+    distance_table.bulk_set_distances(iter_distance_cells(rows, distance_table, malformed_rows))
+    
+    # Return the table of distances we've created
+    return distance_table
+    
+# This function reads the rows of the distances.csv file after the header and
+# yields an (ID A, ID B, distance) triple for each distance in them. Any row or
+# cell that can't be used is skipped and recorded in malformed_rows as a (row
+# number, reason) pair. This includes missing rows and empty or missing cells
+# in the lower triangle, since those distances would otherwise be left as 0
+# Big O: O(n^2)
+def iter_distance_cells(rows, distance_table, malformed_rows):
+    num_addresses = distance_table.num_addresses
     
-    # Iterate through each column in the csv file. The value at the top of the
-    # column is our Point A
-    for x, point_a in enumerate(distance_data[0]):
+    # Iterate through each row in the csv file. Row y + 1 holds the distances
+    # from the address with ID y to every address with an ID less than or
+    # equal to y
+    num_rows = 0
+    for y, row in enumerate(rows):
+        num_rows = y + 1
+        if y >= num_addresses:
+            malformed_rows.append((y + 1, "more rows than there are addresses"))
+            continue
+            
+        if not row or row[0] != distance_table.addresses[y]:
+            malformed_rows.append((y + 1, f"expected the row for '{distance_table.addresses[y]}'"))
+            continue
+            
+        # Only the cells up to and including the one for the address itself are
+        # used. The cells after it are part of the layout of the file and are
+        # usually empty
+        cells = row[1:y + 2]
+        if len(cells) < y + 1:
+            malformed_rows.append((y + 1, f"expected {y + 1} distances but found {len(cells)}"))
             
-        # Iterate through each row in the csv file. The value in the first cell
-        # of our row is our Point B
-        for y, point_b in enumerate(row[0] for row in distance_data):
+        for x, cell in enumerate(cells):
+            if not cell:
+                malformed_rows.append((y + 1, f"missing the distance to '{distance_table.addresses[x]}'"))
+                continue
                 
-            # The value in the cell where point_a and point_b line up is the
+            # The value in the cell where the two addresses line up is the
             # distance between these two points
             try:
-                distance = float(distance_data[x][y])
+                distance = float(cell)
             except ValueError:
+                malformed_rows.append((y + 1, f"'{cell}' is not a distance"))
                 continue
                 
-            # Add the distance from Point A to Point B to the table.
             # The distance from A to B and B to A are identical, but only A to B
-            # is actually listed in the csv file. So we will fill out both
-            # directions now
-            distance_table.get_val(point_a).insert_val(point_b, distance)                
-            distance_table.get_val(point_b).insert_val(point_a, distance)
+            # is actually listed in the csv file. The table will fill out both
+            # directions
+            yield x, y, distance
+            
+    # Every address needs a row, otherwise its distances are all missing
+    for y in range(num_rows, num_addresses):
+        malformed_rows.append((y + 1, f"missing the row for '{distance_table.addresses[y]}'"))
     
-    # Return the table of distances we've created
-    return distance_table
-           
-# This function reads the data pulled from the packages.csv file and parses it
-# into a hash table of package objects
+# This function converts the rows pulled from the packages.csv file into
+# package objects and yields them in lists of up to chunk_size packages. Each
+# package's address is resolved to its ID in the distance table here, so routing
+# never has to look it up again. Any row that can't be converted is skipped and
+# recorded in malformed_rows as a (row number, reason) pair, as is any row that
+# repeats the ID of an earlier package, which is kept instead
+# Big O: O(n)
+def iter_package_chunks(package_data, distance_table, chunk_size=PACKAGE_CHUNK_SIZE, malformed_rows=None):
+    if malformed_rows is None:
+        malformed_rows = []
+        
+    # The row each package ID was first seen on
+    first_rows = HashTable(chunk_size)
+    chunk = []
+    for row_number, values in enumerate(package_data, 1):
+        if len(values) < 8:
+            malformed_rows.append((row_number, f"expected at least 8 columns but found {len(values)}"))
+            continue
+            
+        try:
+            key = int(values[0])
+            address_id = distance_table.get_address_id(values[1])
+            notes = values[8] if len(values) > 8 else ""
+            new_package = Package(key, values[1], values[2], values[3], values[4], values[5], values[6], values[7], notes, address_id)
+            
+        # A KeyError means the address isn't in the distance table, while a
+        # ValueError means the ID or one of the times couldn't be parsed
+        except KeyError:
+            malformed_rows.append((row_number, f"unknown address '{values[1]}'"))
+            continue
+            
+        except ValueError as error:
+            malformed_rows.append((row_number, str(error)))
+            continue
+            
+        if first_rows.has_key(key):
+            malformed_rows.append((row_number, f"package {key} is already listed on row {first_rows.get_val(key)}"))
+            continue
+            
+        first_rows.insert_val(key, row_number)
+        chunk.append(new_package)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+            
+    if chunk:
+        yield chunk
+        
+# This function reads the rows pulled from the packages.csv file and parses them
+# into a hash table of package objects. The rows are read in chunks, and each
+# chunk is added to the table before the next one is read
 # Big O: O(n)
-def create_package_hashtable(package_data):
-    table_size = len(package_data)
+def create_package_hashtable(package_data, distance_table, malformed_rows=None):
+    table_size = len(package_data) if hasattr(package_data, "__len__") else PACKAGE_CHUNK_SIZE
     package_table = HashTable(table_size)
     
-    for values in package_data:
-        key = int(values[0])
-        new_package = Package(key, values[1], values[2], values[3], values[4], values[5], values[6], values[7])
-        package_table.insert_val(key, new_package)
+    for chunk in iter_package_chunks(package_data, distance_table, PACKAGE_CHUNK_SIZE, malformed_rows):
+        package_table.bulk_insert([(new_package.package_id, new_package) for new_package in chunk])
         
     return package_table
+    
+# This function reads a speed profile csv file and returns a SpeedProfile. The
+# header row holds the start time of each bucket, which must be evenly spaced,
+# and each row after it holds the speed factors for one speed class, starting
+# with class 0. Example:
+#   class,8:00 AM,9:00 AM,10:00 AM
+#   0,0.6,1,1
+#   1,0.4,0.9,1
+# Big O: O(c*b) for c classes and b buckets
+def load_speed_profile(profile_path):
+    with open(profile_path, newline="") as f:
+        rows = [row for row in csv.reader(f) if row]
+        
+    if not rows:
+        raise ValueError(f"{profile_path} is empty")
+        
+    start_minutes = [time_to_minutes(cell) - 8*60 for cell in rows[0][1:]]
+    bucket_minutes = start_minutes[1] - start_minutes[0] if len(start_minutes) > 1 else 24*60
+    if bucket_minutes <= 0 or any(b - a != bucket_minutes for a, b in zip(start_minutes, start_minutes[1:])):
+        raise ValueError(f"The time buckets in {profile_path} must be evenly spaced")
+        
+    factors = []
+    for row_number, row in enumerate(rows[1:], 1):
+        if row[0].strip() != str(len(factors)):
+            raise ValueError(f"Row {row_number} of {profile_path} should be speed class {len(factors)}")
+            
+        try:
+            factors.append([float(cell) for cell in row[1:]])
+        except ValueError:
+            raise ValueError(f"Row {row_number} of {profile_path} has a speed factor that isn't a number") from None
+            
+    return SpeedProfile(factors, bucket_minutes/60, start_minutes[0]/60 if start_minutes else 0)
+    
+# This function reads the rows of a speed class csv file, skipping the header
+# row, and gives each listed pair of addresses its speed class in the distance
+# table. Each row holds two addresses and a class. Any row that can't be used
+# is skipped and recorded in malformed_rows as a (row number, reason) pair
+# Big O: O(n) for n rows, plus O(a^2) for a addresses the first time a class is set
+def load_speed_classes(classes_path, distance_table, malformed_rows=None):
+    if malformed_rows is None:
+        malformed_rows = []
+        
+    num_classes = len(distance_table.speed_profile.factors)
+    with open(classes_path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        
+        for row_number, row in enumerate(reader, 1):
+            if len(row) < 3:
+                malformed_rows.append((row_number, f"expected 3 columns but found {len(row)}"))
+                continue
+                
+            if not distance_table.address_ids.has_key(row[0]) or not distance_table.address_ids.has_key(row[1]):
+                malformed_rows.append((row_number, f"unknown address '{row[0] if not distance_table.address_ids.has_key(row[0]) else row[1]}'"))
+                continue
+                
+            if not row[2].strip().isdigit() or int(row[2]) >= num_classes:
+                malformed_rows.append((row_number, f"'{row[2]}' is not a speed class in the profile"))
+                continue
+                
+            distance_table.set_speed_class(distance_table.get_address_id(row[0]), distance_table.get_address_id(row[1]), int(row[2]))
+            
+    return malformed_rows
 
+# This function returns the number of distances stored in the lower triangle
+# of a table with the provided number of addresses, including the distance from
+# each address to itself
+# Big O: O(1)
+def get_triangle_size(num_addresses):
+    return num_addresses*(num_addresses + 1)//2
+    
+# This function creates a zeroed array of the provided size and typecode to
+# hold distances. If a path is provided the array is kept in that file and
+# memory-mapped instead, so it doesn't have to fit in memory and can be opened
+# by other processes with open_matrix()
+# Big O: O(n)
+def create_matrix(size, typecode="d", path=None):
+    if path is None:
+        return array.array(typecode, bytes(size*array.array(typecode).itemsize))
+        
+    num_bytes = size*array.array(typecode).itemsize
+    with open(path, "w+b") as f:
+        f.truncate(max(1, num_bytes))
+        mapped_file = mmap.mmap(f.fileno(), 0)
+        
+    return memoryview(mapped_file)[:num_bytes].cast(typecode)
+    
+# This function memory-maps a distance array saved by create_matrix() so that
+# it can be used without reading it into memory. Every process that opens the
+# same file shares a single copy of it through the operating system's cache
+# Big O: O(1)
+def open_matrix(path, size, typecode="d", writable=False):
+    num_bytes = size*array.array(typecode).itemsize
+    with open(path, "r+b" if writable else "rb") as f:
+        if os.fstat(f.fileno()).st_size < num_bytes:
+            raise ValueError(f"'{path}' is too small to hold {size} distances")
+            
+        if num_bytes == 0:
+            return memoryview(b"").cast(typecode)
+            
+        mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        
+    return memoryview(mapped_file)[:num_bytes].cast(typecode)
+    
+# This function returns a fingerprint of a file that changes whenever the file
+# is modified: its size and the time it was last modified
+# Big O: O(1)
+def get_file_fingerprint(path):
+    stats = os.stat(path)
+    return stats.st_size, stats.st_mtime_ns
+    
+# This function returns a hash of the contents of a file. It's only used when a
+# file's fingerprint has changed, to check whether its contents really changed
+# Big O: O(n)
+def get_file_hash(path):
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            file_hash.update(block)
+            
+    return file_hash.hexdigest()
+    
+# This function saves the distance and package tables to a binary snapshot file
+# so that later runs can skip parsing the csv files. The file starts with a
+# header containing the length of the metadata section and the position of the
+# distance matrix, followed by the metadata (addresses, packages, skipped rows
+# and the source file details), followed by the raw distance matrix. The
+# metadata is stored as JSON, with packages as plain rows rather than Package
+# objects, so loading a snapshot can never run code that was put in the file
+# Big O: O(n + a^2) for n packages and a addresses
+def save_snapshot(snapshot_path, source_paths, distance_table, package_table, malformed_distances, malformed_packages):
+    sources = [(os.fspath(path), get_file_fingerprint(path), get_file_hash(path)) for path in source_paths]
+    metadata = json.dumps({
+        "sources": sources,
+        "byteorder": sys.byteorder,
+        "typecode": distance_table.typecode,
+        "addresses": distance_table.addresses,
+        "package_rows": [package.get_row() for package in package_table.values()],
+        "malformed_distances": malformed_distances,
+        "malformed_packages": malformed_packages,
+    }).encode()
+    
+    # The matrix is placed at a multiple of 8 bytes so it can be read
+    # directly out of the file as an array of doubles or floats
+    matrix_offset = SNAPSHOT_HEADER.size + len(metadata)
+    matrix_offset += -matrix_offset % 8
+    
+    # The snapshot is written to a temporary file first and then moved into
+    # place, so other processes never see a partly written snapshot
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(metadata), matrix_offset))
+        f.write(metadata)
+        f.write(bytes(matrix_offset - SNAPSHOT_HEADER.size - len(metadata)))
+        f.write(distance_table.matrix)
+        
+    os.replace(temp_path, snapshot_path)
+    
+# This function loads the distance and package tables from a snapshot file
+# created by save_snapshot(). The distance matrix is memory-mapped rather than
+# read, so it's only loaded from disk as it's used. If the snapshot doesn't
+# exist or any of the source files have changed since it was saved, None is
+# returned instead, as it is if the snapshot stores distances with a different
+# typecode than the one asked for
+# Big O: O(n) for n packages
+def load_snapshot(snapshot_path, source_paths, typecode="d"):
+    try:
+        with open(snapshot_path, "rb") as f:
+            magic, metadata_length, matrix_offset = SNAPSHOT_HEADER.unpack(f.read(SNAPSHOT_HEADER.size))
+            if magic != SNAPSHOT_MAGIC:
+                return None
+                
+            metadata = json.loads(f.read(metadata_length))
+            
+            # The snapshot is only valid if it was made from the same files. If a
+            # file's fingerprint changed, its hash is checked in case only its
+            # modification time changed. JSON stores tuples as lists, so the
+            # fingerprints are turned back into tuples to compare them
+            saved_paths = [path for path, _, _ in metadata["sources"]]
+            if saved_paths != [os.fspath(path) for path in source_paths] or metadata["byteorder"] != sys.byteorder or metadata["typecode"] != typecode:
+                return None
+                
+            for path, fingerprint, file_hash in metadata["sources"]:
+                current = get_file_fingerprint(path)
+                if current != tuple(fingerprint) and (current[0] != fingerprint[0] or get_file_hash(path) != file_hash):
+                    return None
+                    
+            num_bytes = get_triangle_size(len(metadata["addresses"]))*array.array(typecode).itemsize
+            matrix = memoryview(b"").cast(typecode)
+            if num_bytes:
+                mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                matrix = memoryview(mapped_file)[matrix_offset:matrix_offset + num_bytes].cast(typecode)
+                
+        # A snapshot that was changed by hand can have rows of the wrong shape,
+        # which is treated the same as a snapshot that can't be read
+        distance_table = DistanceTable(metadata["addresses"], matrix, typecode)
+        package_table = HashTable(len(metadata["package_rows"]))
+        package_table.bulk_insert((row[0], Package(*row)) for row in metadata["package_rows"])
+        malformed_distances = [tuple(row) for row in metadata["malformed_distances"]]
+        malformed_packages = [tuple(row) for row in metadata["malformed_packages"]]
+        
+    except (OSError, ValueError, TypeError, EOFError, KeyError, struct.error):
+        return None
+        
+    return distance_table, package_table, malformed_distances, malformed_packages
+    
+# This function creates the distance and package tables. If a snapshot of the
+# tables made from the same csv files exists it is loaded, otherwise the csv
+# files are parsed and a new snapshot is saved for next time. It returns the two
+# tables along with the rows of each file that had to be skipped. The distances
+# are stored with the provided typecode, and when matrix_path is given they're
+# kept in a memory-mapped file there, whether they're parsed or come from the
+# snapshot
+# If shortest_paths is true, the distances are replaced with shortest path
+# distances once the tables are loaded. The snapshot always holds the distances
+# from the file, so this is done on every run
+# Big O: O(n + a^2) for n packages and a addresses, O(n + a^3) with shortest paths
+def load_tables(distances_path="distances.csv", packages_path="packages.csv", snapshot_path=SNAPSHOT_PATH, typecode="d", matrix_path=None,
+                shortest_paths=False):
+    source_paths = [distances_path, packages_path]
+    
+    if snapshot_path is not None:
+        snapshot = load_snapshot(snapshot_path, source_paths, typecode)
+        if snapshot is not None:
+            # The snapshot's matrix is mapped from the snapshot file itself, so
+            # it's copied to matrix_path for other processes to open from there
+            if matrix_path is not None:
+                matrix = create_matrix(len(snapshot[0].matrix), typecode, matrix_path)
+                matrix[:] = snapshot[0].matrix
+                snapshot[0].matrix = matrix
+                
+            if shortest_paths:
+                snapshot[0].apply_shortest_paths()
+            return snapshot
+            
+    malformed_distances = []
+    distance_data = load_distance_data(distances_path)
+    distance_table = create_distance_hashtable(distance_data, malformed_distances, typecode, matrix_path)
+    
+    malformed_packages = []
+    package_data = load_package_data(packages_path)
+    package_table = create_package_hashtable(package_data, distance_table, malformed_packages)
+    
+    # Failing to save a snapshot isn't a problem, it just means the next run
+    # will have to parse the csv files again
+    if snapshot_path is not None:
+        try:
+            save_snapshot(snapshot_path, source_paths, distance_table, package_table, malformed_distances, malformed_packages)
+        except OSError:
+            pass
+            
+    if shortest_paths:
+        distance_table.apply_shortest_paths()
+        
+    return distance_table, package_table, malformed_distances, malformed_packages
+    
 # This function returns the distance in miles between two addresses
 # Big O: O(1) to O(n)
 def get_address_distance(distance_table, point_a, point_b):
-    val = distance_table.get_val(point_a)
-    return val.get_val(point_b)
+    id_a = distance_table.get_address_id(point_a)
+    id_b = distance_table.get_address_id(point_b)
+    return distance_table.get_distance(id_a, id_b)
    
-# This function retrieves the destination addresses for two packages and 
-# feeds them into get_address_distance() to calculate and return the distance
-# between them
+# This function retrieves the destination address IDs for two packages and 
+# uses them to look up and return the distance between them
 # Big O: O(1) to O(n)
 def get_package_distance(package_table, distance_table, pkg_1, pkg_2):
-    address_1 = package_table.get_val(pkg_1).address
-    address_2 = package_table.get_val(pkg_2).address
-    return get_address_distance(distance_table, address_1, address_2)
+    address_1 = package_table.get_val(pkg_1).address_id
+    address_2 = package_table.get_val(pkg_2).address_id
+    return distance_table.get_distance(address_1, address_2)
 
 # This function returns the distance that a given package's destination is
 # from the hub
 # Big O: O(1) to O(n)
 def get_distance_from_hub(package_table, distance_table, pkg):
-    address = package_table.get_val(pkg).address
-    return get_address_distance(distance_table, "HUB", address)
-    
-# This function runs the delivery simulation for all the trucks and records
-# the results in a SimulationResult object, which it then returns
-# Big O: O(n^2) 
-def run_simulation(package_table, distance_table, hours_passed):
-    simulator = Simulator()
-    
-    # These are our three batches of packages. They have been divided into
-    # these three groups to ensure that all packages get delivered in an
-    # efficient manner. The order of the packages in these lists does NOT
-    # matter - the route taken by the trucks is determined by an algorithm
-    # and is independent of the ordering of the list
-    packages_a = [3, 7, 8, 12, 13, 14, 15, 16, 19, 21, 29, 30, 34, 37]
-    packages_b = [2, 5, 9, 10, 11, 17, 18, 23, 24, 27, 32, 33, 35, 36, 38, 39]
-    packages_c = [1, 4, 6, 20, 22, 25, 26, 28, 31, 40]
-    
-    # Run the simulation for Truck A carrying package list A
-    a_departure_time = max(package_table.get_val(pkg).get_arrival_time() for pkg in packages_a)
-    results_a = simulator.simulate_delivery("Truck A", package_table, distance_table, packages_a, a_departure_time, hours_passed)
-    
-    # Run the simulation for Truck B carrying package list B
-    b_departure_time = max(package_table.get_val(pkg).get_arrival_time() for pkg in packages_b)
-    results_b = simulator.simulate_delivery("Truck B", package_table, distance_table, packages_b, b_departure_time, hours_passed)
-    
-    # We only have two drivers, so package group C will be picked up by the first
-    # truck that returns from its deliveries
-    c_departure_time = None
-    c_truck_name = "No truck"
-    
-    # Determine which truck will be carrying package group C
-    if results_a.was_route_completed() or results_b.was_route_completed():
-        c_earliest_time = max(package_table.get_val(pkg).get_arrival_time() for pkg in packages_c)
-        c_departure_time = max(c_earliest_time, min(results_a.time_ended, results_b.time_ended))
-        if results_a.time_ended < results_b.time_ended:
-            c_truck_name = "Truck A-2"
-            
-        else:
-            c_truck_name = "Truck B-2"
+    address = package_table.get_val(pkg).address_id
+    return distance_table.get_distance(distance_table.get_hub_id(), address)
+    
+# This function returns the speed class of each leg of a route, including the
+# trip back to the hub, in the same order as the route's distance list. If the
+# distance table has no SpeedProfile, it returns None
+# Big O: O(n)
+def get_leg_classes(package_table, distance_table, pkg_route):
+    if distance_table.speed_profile is None:
+        return None
         
-    # Run the simulation for Truck A or B carrying package list C
-    results_c = simulator.simulate_delivery(c_truck_name, package_table, distance_table, packages_c, c_departure_time, hours_passed)
+    hub_id = distance_table.get_hub_id()
+    address_ids = [hub_id] + [package_table.get_val(pkg_id).address_id for pkg_id in pkg_route] + [hub_id]
+    return [distance_table.get_speed_class(address_ids[index], address_ids[index + 1]) for index in range(len(address_ids) - 1)]
+    
+# This function divides the packages between the trucks, plans the delivery
+# routes for all of them and records them in a DayTimeline object, which it
+# then returns. If improve_time is provided, each route is improved with local
+# search for up to that many seconds. No truck departs before start_time.
+# Routes are looked up in the route cache before they're calculated
+# Big O: O(n^2/c + n*c) for truck capacity c
+def create_day_timeline(package_table, distance_table, improve_time=None, num_trucks=NUM_TRUCKS, num_drivers=NUM_DRIVERS, truck_capacity=TRUCK_CAPACITY, speed=TRUCK_SPEED, start_time=0):
+    simulator = Simulator(speed, route_cache)
+    load_planner = LoadPlanner(num_trucks, num_drivers, truck_capacity, speed, start_time)
+    return load_planner.plan_day(package_table, distance_table, simulator, improve_time)
+    
+# This function runs the delivery simulation for all the trucks and returns a
+# SimulationSnapshot with a SimulationResult for each trip and the state of
+# every package. If a DayTimeline has already been created it is reused,
+# otherwise one is created, with each route improved for up to improve_time
+# seconds if it's provided. The package table is never modified
+# Big O: O(n) with a DayTimeline, O(n^2) without
+def run_simulation(package_table, distance_table, hours_passed, day_timeline=None, improve_time=None):
+    if day_timeline is None:
+        with instrumentation.time_phase("route"):
+            day_timeline = create_day_timeline(package_table, distance_table, improve_time)
+            
+    with instrumentation.time_phase("simulate"):
+        snapshot = day_timeline.get_snapshot(hours_passed)
     
     # Return our results
-    return [results_a, results_b, results_c]
+    return snapshot
+    
+# This function runs the simulation at every one of the provided times in a
+# single pass, and returns a SimulationReplay of the results. The DayTimeline
+# is reused or created the same way as in run_simulation()
+# Big O: O(n + t*q + q*log q) for t trips and q times, not including routing
+def run_replay(package_table, distance_table, times, day_timeline=None, improve_time=None):
+    if day_timeline is None:
+        with instrumentation.time_phase("route"):
+            day_timeline = create_day_timeline(package_table, distance_table, improve_time)
+            
+    with instrumentation.time_phase("simulate"):
+        replay = day_timeline.get_replay(times)
+        
+    return replay
+    
+# These are the tables used by the worker processes in a scenario sweep. Each
+# worker sets them up once when it starts, rather than receiving them with
+# every scenario
+worker_package_table = None
+worker_distance_table = None
+worker_shared_memory = None
+
+# This function creates every combination of the provided scenario settings
+# Big O: O(n) for n combinations
+def create_scenario_grid(speeds, start_times, truck_counts, driver_counts, capacities):
+    return [Scenario(*values) for values in itertools.product(speeds, start_times, truck_counts, driver_counts, capacities)]
+    
+# This function plans the day for a single scenario and summarizes the result
+# Big O: O(n^2/c + n*c) for truck capacity c
+def evaluate_scenario(package_table, distance_table, scenario):
+    try:
+        day_timeline = create_day_timeline(package_table, distance_table, None, scenario.num_trucks, scenario.num_drivers, scenario.truck_capacity, scenario.speed, scenario.start_time)
+        
+    except ValueError as error:
+        return ScenarioResult(scenario, None, None, None, str(error))
+        
+    return ScenarioResult(scenario, day_timeline.get_total_miles(), day_timeline.count_late_packages(package_table), day_timeline.get_completion_time())
+    
+# This function is run once in each worker process of a scenario sweep. The
+# distance matrix is attached from shared memory instead of being copied, and
+# the package table is received once per worker
+# Big O: O(a) for a addresses
+def init_scenario_worker(shared_name, addresses, typecode, package_table, speed_profile=None, speed_classes=None):
+    global worker_package_table, worker_distance_table, worker_shared_memory
+    
+    worker_shared_memory = shared_memory.SharedMemory(name=shared_name)
+    num_bytes = get_triangle_size(len(addresses))*array.array(typecode).itemsize
+    matrix = worker_shared_memory.buf[:num_bytes].cast(typecode)
+    worker_distance_table = DistanceTable(addresses, matrix, typecode)
+    worker_distance_table.speed_profile = speed_profile
+    worker_distance_table.speed_classes = speed_classes
+    worker_package_table = package_table
+    
+# This function evaluates a scenario inside a worker process
+# Big O: O(n^2/c + n*c) for truck capacity c
+def evaluate_worker_scenario(scenario):
+    return evaluate_scenario(worker_package_table, worker_distance_table, scenario)
+    
+# This function evaluates every scenario in the provided list using a pool of
+# worker processes, one per CPU core by default. The results are returned in
+# the same order as the scenarios
+# Big O: O(s*(n^2/c + n*c)/w) for s scenarios and w workers
+def run_scenario_sweep(package_table, distance_table, scenarios, num_workers=None):
+    num_workers = num_workers or os.cpu_count() or 1
     
+    # Copy the distance matrix into shared memory so that every worker can
+    # read the same copy
+    matrix_bytes = distance_table.matrix.tobytes()
+    shared_matrix = shared_memory.SharedMemory(create=True, size=max(1, len(matrix_bytes)))
+    
+    try:
+        shared_matrix.buf[:len(matrix_bytes)] = matrix_bytes
+        
+        # Send the scenarios to the workers in chunks to cut down on the
+        # overhead of communicating with them
+        chunk_size = max(1, len(scenarios)//(num_workers*4))
+        initargs = (shared_matrix.name, distance_table.addresses, distance_table.typecode, package_table, distance_table.speed_profile,
+                    distance_table.speed_classes)
+        with concurrent.futures.ProcessPoolExecutor(num_workers, initializer=init_scenario_worker, initargs=initargs) as executor:
+            return list(executor.map(evaluate_worker_scenario, scenarios, chunksize=chunk_size))
+            
+    finally:
+        shared_matrix.close()
+        shared_matrix.unlink()
+        
+# This function prints the results of a scenario sweep as a table, with one
+# row per scenario
+# Big O: O(s) for s scenarios
+def print_scenario_results(scenario_results):
+    print(f"{'speed':>6} {'start':>8} {'trucks':>6} {'drivers':>7} {'capacity':>8} {'miles':>9} {'late':>5} {'completed':>9}")
+    
+    for result in scenario_results:
+        scenario = result.scenario
+        settings = f"{scenario.speed:>6} {float_to_time(scenario.start_time, 8):>8} {scenario.num_trucks:>6} {scenario.num_drivers:>7} {scenario.truck_capacity:>8}"
+        
+        if result.error is not None:
+            print(f"{settings} error: {result.error}")
+            continue
+            
+        print(f"{settings} {round(result.total_miles, 1):>9} {result.num_late:>5} {float_to_time(result.time_completed, 8):>9}")
+        
+# This function returns a dictionary describing a package's delivery state, as
+# returned by get_package_state(), at the provided time. A package is late if it
+# was delivered after its deadline or its deadline passed before it was delivered
+# Big O: O(1)
+def get_package_record(the_package, delivery_state, hours_passed):
+    delivery_status, delivery_time, carrier = delivery_state
+    deadline = the_package.get_deadline()
+    return {
+        "package": the_package.package_id,
+        "status": DELIVERY_STATUS_NAMES[delivery_status],
+        "carrier": carrier,
+        "delivery_time": float_to_time(delivery_time, 8) if delivery_time is not None else None,
+        "deadline": the_package.deadline,
+        "late": delivery_time > deadline if delivery_time is not None else hours_passed > deadline,
+    }
+    
+# This function returns a dictionary describing a single truck trip from its
+# SimulationResult
+# Big O: O(1)
+def get_trip_record(result):
+    return {
+        "name": result.truck_name,
+        "status": result.get_truck_status(),
+        "miles_traveled": round(result.distance_traveled, 2),
+        "route_length": round(result.route_length, 2),
+        "packages_delivered": result.total_delivered,
+        "packages_total": result.num_packages,
+    }
+    
+# This function returns a dictionary with the totals for the whole fleet from
+# the SimulationResult of every trip
+# Big O: O(t) for t trips
+def get_overview_record(results, hours_passed):
+    return {
+        "time": float_to_time(hours_passed, 8),
+        "miles_traveled": round(sum(result.distance_traveled for result in results), 1),
+        "miles_required": round(sum(result.route_length for result in results), 1),
+        "packages_delivered": sum(result.total_delivered for result in results),
+        "packages_total": sum(result.num_packages for result in results),
+    }
+    
+# The StatusServer class answers package status and fleet overview queries over
+# HTTP on localhost. The routes are planned once before the server starts, and
+# every query is answered from that plan with a few lookups, so no simulation
+# is run per request. All connections are handled on a single asyncio event
+# loop, which lets many clients be served at once without a thread for each
+#   - GET /status?package=3,7&time=10:30AM returns the status of each package
+#   - GET /overview?time=10:30AM returns the state of every truck
+#   - POST /batch takes a JSON list of queries, each {"package": 3, "time": "10:30AM"}
+#     for a package status or {"time": "10:30AM"} for an overview, and answers
+#     them all in a single response
+class StatusServer:
+    MAX_BODY_SIZE = 1 << 20
+    
+    def __init__(self, package_table, day_timeline, host="127.0.0.1", port=8080):
+        self.package_table = package_table
+        self.day_timeline = day_timeline
+        self.host = host
+        self.port = port
+        
+    # This method takes a time string in the hh:mmAM/PM format and returns the
+    # number of hours after 8:00AM. Times before 8:00AM are treated as 8:00AM
+    # Big O: O(1)
+    def parse_time(self, string_time):
+        if not string_time:
+            raise ValueError("A time is required")
+            
+        if not isinstance(string_time, str):
+            raise ValueError("Times must be strings in the format 'hh:mm AM' or 'hh:mm PM'")
+            
+        return max(time_to_minutes(string_time)/60 - 8, 0)
+        
+    # This method takes a package ID from a query, either as a whole number or
+    # a string of digits, and returns it as an int. Anything else, such as a
+    # float or a list, is rejected rather than rounded
+    # Big O: O(1)
+    def parse_package_id(self, pkg_id):
+        if isinstance(pkg_id, bool) or not isinstance(pkg_id, (int, str)):
+            raise ValueError(f"Package ID {json.dumps(pkg_id)} is not a whole number")
+            
+        if isinstance(pkg_id, str) and not pkg_id.strip().isdigit():
+            raise ValueError(f"Package ID '{pkg_id}' is not a whole number")
+            
+        return int(pkg_id)
+        
+    # This method returns a dictionary describing the status of a single
+    # package at the provided time
+    # Big O: O(1)
+    def get_package_status(self, pkg_id, hours_passed):
+        if not self.package_table.has_key(pkg_id):
+            return {"package": pkg_id, "error": "Package not found"}
+            
+        the_package = self.package_table.get_val(pkg_id)
+        delivery_state = self.day_timeline.get_package_state(pkg_id, hours_passed)
+        record = get_package_record(the_package, delivery_state, hours_passed)
+        record["description"] = the_package.describe_state(*delivery_state)
+        return record
+        
+    # This method returns a dictionary describing every truck trip at the
+    # provided time, along with the totals for the whole fleet
+    # Big O: O(t*log n) for t trips
+    def get_overview(self, hours_passed):
+        results = self.day_timeline.get_results(hours_passed)
+        overview = get_overview_record(results, hours_passed)
+        overview["trucks"] = [get_trip_record(result) for result in results]
+        return overview
+        
+    # This method answers a single query from a batch. Errors are returned in
+    # place of the answer so that one bad query doesn't fail the whole batch
+    # Big O: O(1) for a package, O(t*log n) for an overview
+    def answer_query(self, query):
+        if not isinstance(query, dict):
+            return {"error": "Each query must be a JSON object"}
+            
+        try:
+            hours_passed = self.parse_time(query.get("time"))
+            if "package" not in query:
+                return self.get_overview(hours_passed)
+                
+            return self.get_package_status(self.parse_package_id(query["package"]), hours_passed)
+            
+        except ValueError as error:
+            return {"error": str(error)}
+            
+    # This method takes the method, target, and body of an HTTP request and
+    # returns the status code and the JSON payload to respond with. Any error
+    # that isn't caused by bad input is answered with a 500 instead of being
+    # raised, so the connection stays usable for the client's next request
+    # Big O: O(q) for q queries
+    def handle_request(self, method, target, body):
+        url = urllib.parse.urlsplit(target)
+        params = urllib.parse.parse_qs(url.query)
+        
+        try:
+            if url.path == "/status" and method == "GET":
+                hours_passed = self.parse_time(params.get("time", [None])[0])
+                pkg_ids = [self.parse_package_id(pkg_id) for value in params.get("package", []) for pkg_id in value.split(",") if pkg_id.strip()]
+                if not pkg_ids:
+                    raise ValueError("At least one package is required")
+                    
+                return 200, {"time": float_to_time(hours_passed, 8), "packages": [self.get_package_status(pkg_id, hours_passed) for pkg_id in pkg_ids]}
+                
+            if url.path == "/overview" and method == "GET":
+                return 200, self.get_overview(self.parse_time(params.get("time", [None])[0]))
+                
+            if url.path == "/batch" and method == "POST":
+                queries = json.loads(body or b"null")
+                if not isinstance(queries, list):
+                    raise ValueError("The request body must be a JSON list of queries")
+                    
+                return 200, {"results": [self.answer_query(query) for query in queries]}
+                
+        except ValueError as error:
+            return 400, {"error": str(error)}
+            
+        except Exception as error:
+            return 500, {"error": f"Internal error: {type(error).__name__}"}
+            
+        if url.path in ("/status", "/overview", "/batch"):
+            return 405, {"error": f"Method {method} is not allowed for {url.path}"}
+            
+        return 404, {"error": f"Unknown path {url.path}"}
+        
+    # This method reads HTTP requests from a single connection and writes a
+    # response to each one. Connections are kept open between requests unless
+    # the client asks for them to be closed
+    # Big O: O(r) for r requests
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                    
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                    
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    content_length = int(headers.get("content-length", 0))
+                    
+                except ValueError:
+                    await self.send_response(writer, 400, {"error": "Malformed request"}, False)
+                    break
+                    
+                if not 0 <= content_length <= self.MAX_BODY_SIZE:
+                    await self.send_response(writer, 413, {"error": "Request body is too large"}, False)
+                    break
+                    
+                body = await reader.readexactly(content_length)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                
+                with instrumentation.time_phase("query"):
+                    status_code, payload = self.handle_request(method, target, body)
+                await self.send_response(writer, status_code, payload, keep_alive)
+                
+                if not keep_alive:
+                    break
+                    
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+            
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+                
+    # This method writes a JSON payload to the connection as an HTTP response
+    # Big O: O(n) for a payload of size n
+    async def send_response(self, writer, status_code, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status_code} {http.HTTPStatus(status_code).phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+        
+    # This method starts listening for connections and serves them until the
+    # program is stopped
+    # Big O: O(1)
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        addresses = ", ".join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"Serving package status queries on {addresses}")
+        
+        async with server:
+            await server.serve_forever()
+            
 # This function asks the user what time they want to run the simulation at
 # and what package (if any) they want to see the status of
 # Big O: O(1)
-def get_simulation_input():
+def get_simulation_input(package_table):
     while True:
-        print("The day starts at 8:00AM, there are 40 packages")
+        print(f"The day starts at 8:00AM, there are {len(package_table)} packages")
         print("Leave package# blank to view all packages")
         
         while True:
@@ -503,7 +3524,7 @@ def get_simulation_input():
                 chosen_pkg = chosen[1]
                 chosen_pkg = int(chosen_pkg)
                 
-                if chosen_pkg not in range(1, 41):
+                if not package_table.has_key(chosen_pkg):
                     raise ValueError
                 
             # If the user didn't provide a package id then we will display
@@ -511,10 +3532,10 @@ def get_simulation_input():
             except IndexError:
                 chosen_pkg = None
                 
-            # A value error will be raised if the provided id isn't an integer
-            # in the range 1 to 40
+            # A value error will be raised if the provided id isn't the id of
+            # a package in the package table
             except ValueError:
-                print("Please ensure package# is a number between 1 and 40")
+                print("Please ensure package# is the id of one of the packages")
                 continue
             
             # Return the user input
@@ -522,7 +3543,10 @@ def get_simulation_input():
 
 # This function displays the results of the simulation to the user
 # Big O: O(n)
-def print_simulation_results(package_table, hours_passed, chosen_pkg, simulation_list):
+def print_simulation_results(package_table, chosen_pkg, snapshot, distance_table=None):
+    hours_passed = snapshot.hours_passed
+    simulation_list = snapshot.results
+    
     # Get the totals for all the simulation results
     num_pkgs_delivered = sum([result.total_delivered for result in simulation_list])
     num_pkgs_total = sum([result.num_packages for result in simulation_list])
@@ -546,32 +3570,228 @@ def print_simulation_results(package_table, hours_passed, chosen_pkg, simulation
     # If the user specified a package to view then we only display that package's status
     if chosen_pkg is not None:
         the_package = package_table.get_val(chosen_pkg)
-        print(f"Package #{chosen_pkg}: {the_package.get_status()}")
+        print(f"Package #{chosen_pkg}: {the_package.get_status(snapshot)}")
+        
+        # If the routes use shortest paths, show the way from the hub to the
+        # package since it may pass through other addresses
+        if distance_table is not None and distance_table.next_hops is not None:
+            path = distance_table.get_path(distance_table.get_hub_id(), the_package.address_id)
+            print(f"Shortest path from the hub: {' -> '.join(distance_table.addresses[address_id] for address_id in path)}")
         
     # If the user didn't specify a package, then we print all package statuses
     else:
-        for pkg_id in [x for x in range(1, 41)]:
-            the_package = package_table.get_val(pkg_id)
-            print(f"Package #{pkg_id}: {the_package.get_status()}")
+        for pkg_id, the_package in sorted(package_table.items()):
+            print(f"Package #{pkg_id}: {the_package.get_status(snapshot)}")
+    
+# This function writes the results of a SimulationReplay to a file as JSON Lines
+# or csv instead of printing them for a person to read. For each time, in the
+# order they were provided, the fleet overview and each trip come first,
+# followed by every package in the package table in ID order. status_filter can
+# be "late", "at-hub", "in-transit" or "delivered" to only write those packages.
+# Each package's status is read straight from the ranks stored in the replay,
+# so no SimulationSnapshot has to be built for each time. Records are converted
+# in chunks, and each chunk is written with a single call, so large manifests
+# don't make a call per line
+# Big O: O(n log n + q*(n + t)) for t trips and q times
+def export_simulation_results(package_table, replay, output, output_format="jsonl", status_filter=None):
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, EXPORT_FIELDS)
+        writer.writeheader()
+        
+        def write_chunk(records):
+            writer.writerows(records)
+            output.write(buffer.getvalue())
+            buffer.seek(0)
+            buffer.truncate()
+            
+    elif output_format == "jsonl":
+        def write_chunk(records):
+            output.write("".join(json.dumps(record) + "\n" for record in records))
+            
+    else:
+        raise ValueError(f"Unknown export format '{output_format}'")
+        
+    if status_filter not in (None, "late", "at-hub", "in-transit", "delivered"):
+        raise ValueError(f"Unknown status filter '{status_filter}'")
+        
+    # Each package's row in the DayTimeline is found once and reused for every
+    # time. Packages that aren't on any trip have no row and stay at the hub
+    day_timeline = replay.day_timeline
+    package_rows = day_timeline.package_rows
+    packages = sorted(package_table.items())
+    rows = [package_rows.get_val(pkg_id) if package_rows.has_key(pkg_id) else None for pkg_id, _ in packages]
+    carriers = [day_timeline.truck_timelines[trip_index].truck_name for trip_index in day_timeline.row_trips]
+    status_name = None if status_filter in (None, "late") else status_filter.replace("-", "_")
+    
+    for time_index, hours_passed in enumerate(replay.times):
+        string_time = float_to_time(hours_passed, 8)
+        results = replay.get_results(time_index)
+        records = [{"record": "overview", **get_overview_record(results, hours_passed)}]
+        records.extend({"record": "truck", "time": string_time, **get_trip_record(result)} for result in results)
+        write_chunk(records)
+        
+        rank = replay.ranks[time_index]
+        records = []
+        for (pkg_id, the_package), row in zip(packages, rows):
+            if row is None or rank < replay.departed_ranks[row]:
+                delivery_state = (0, None, None)
+            elif rank < replay.delivered_ranks[row]:
+                delivery_state = (1, None, carriers[row])
+            else:
+                delivery_state = (2, day_timeline.delivery_times[row], carriers[row])
+                
+            record = get_package_record(the_package, delivery_state, hours_passed)
+            if (status_filter == "late" and not record["late"]) or (status_name is not None and record["status"] != status_name):
+                continue
+                
+            records.append({"record": "package", "time": string_time, **record})
+            
+            if len(records) >= EXPORT_CHUNK_SIZE:
+                write_chunk(records)
+                records = []
+                
+        if records:
+            write_chunk(records)
+        
+# This function converts a comma separated string of numbers to a list, with
+# whole numbers converted to ints. Example: "15,17.5,20" -> [15, 17.5, 20]
+# Big O: O(n)
+def parse_number_list(string_list):
+    numbers = [float(value) for value in string_list.split(",") if value.strip()]
+    return [int(number) if number.is_integer() else number for number in numbers]
+    
+# This function warns the user about the rows of a file that couldn't be loaded.
+# Only the first few are listed so that a badly broken file doesn't flood the screen
+# Big O: O(1)
+def print_malformed_rows(file_name, malformed_rows):
+    for row_number, reason in malformed_rows[:10]:
+        print(f"Skipped row {row_number} of {file_name}: {reason}")
+        
+    if len(malformed_rows) > 10:
+        print(f"Skipped {len(malformed_rows) - 10} more rows of {file_name}")
+        
+# This function reads the command line arguments the program was started with
+# Big O: O(1)
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Simulate the day's package deliveries")
+    parser.add_argument("--improve-routes", type=float, metavar="SECONDS", default=None,
+                        help="improve each truck's route with local search for up to SECONDS seconds")
+    parser.add_argument("--no-snapshot", action="store_true", help="always parse the csv files instead of using a saved snapshot")
+    parser.add_argument("--float-distances", action="store_true", help="store distances as 4 byte floats instead of 8 byte doubles")
+    parser.add_argument("--distance-file", default=None, metavar="PATH", help="keep the distance matrix in a memory-mapped file at PATH")
+    parser.add_argument("--shortest-paths", action="store_true", help="route using the shortest path between addresses, which may pass through other addresses")
+    parser.add_argument("--speed-profile", default=None, metavar="PATH", help="csv file of speed factors for each time of day")
+    parser.add_argument("--speed-classes", default=None, metavar="PATH", help="csv file giving pairs of addresses their own row of the speed profile")
+    parser.add_argument("--instrument", nargs="?", const=INSTRUMENTATION_PATH, default=None, metavar="PATH",
+                        help="record lookup counts and phase timings, and write them to PATH as JSON")
+    parser.add_argument("--trucks", type=int, default=NUM_TRUCKS, help="number of trucks available")
+    parser.add_argument("--drivers", type=int, default=NUM_DRIVERS, help="number of drivers available")
+    parser.add_argument("--capacity", type=int, default=TRUCK_CAPACITY, help="number of packages each truck can carry")
+    parser.add_argument("--route-cache-size", type=int, default=ROUTE_CACHE_SIZE, help="number of routes to remember, 0 turns the cache off")
+    parser.add_argument("--serve", action="store_true", help="answer status queries over HTTP instead of running interactively")
+    parser.add_argument("--host", default="127.0.0.1", help="address the server listens on")
+    parser.add_argument("--port", type=int, default=8080, help="port the server listens on")
+    
+    # These arguments write the status of every package at a single time to a
+    # file, instead of running interactively
+    parser.add_argument("--export", choices=["jsonl", "csv"], default=None, help="write the status of every package in this format and exit")
+    parser.add_argument("--export-time", default="5:00PM", metavar="TIMES", help="comma separated times to export the status at, in the format hh:mmAM or hh:mmPM")
+    parser.add_argument("--export-filter", choices=["late", "at-hub", "in-transit", "delivered"], default=None, help="only export packages with this status")
+    parser.add_argument("--export-path", default=None, metavar="PATH", help="file to export to instead of standard output")
+    
+    # These arguments are only used for scenario sweeps. Each one takes a comma
+    # separated list of values, and every combination of them is evaluated
+    parser.add_argument("--sweep", action="store_true", help="evaluate a grid of scenarios instead of running interactively")
+    parser.add_argument("--sweep-speeds", type=parse_number_list, default=None, metavar="LIST", help="truck speeds in miles/hour")
+    parser.add_argument("--sweep-starts", type=parse_number_list, default=[0], metavar="LIST", help="earliest departure times, in hours after 8:00AM")
+    parser.add_argument("--sweep-trucks", type=parse_number_list, default=None, metavar="LIST", help="numbers of trucks")
+    parser.add_argument("--sweep-drivers", type=parse_number_list, default=None, metavar="LIST", help="numbers of drivers")
+    parser.add_argument("--sweep-capacities", type=parse_number_list, default=None, metavar="LIST", help="numbers of packages per truck")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes used for a sweep")
+    args = parser.parse_args()
+    if args.speed_classes is not None and args.speed_profile is None:
+        parser.error("--speed-classes can only be used with --speed-profile")
+        
+    return args
     
 # This function is our main function. It creates our distance and package
 # tables, and then it runs our main loop
 # Big O: O(n^2) (this is also the Big O for our entire program)
 def main():
-    distance_data = load_distance_data()
-    distance_table = create_distance_hashtable(distance_data)
+    args = parse_arguments()
+    
+    # Instrumentation can be turned on with a command line argument or with the
+    # SIMULATOR_INSTRUMENT environment variable, which can also name the report file
+    instrument_env = os.environ.get("SIMULATOR_INSTRUMENT", "")
+    if args.instrument or instrument_env not in ("", "0"):
+        report_path = args.instrument or (instrument_env if instrument_env != "1" else INSTRUMENTATION_PATH)
+        instrumentation.enable(report_path)
     
-    package_data = load_package_data()
-    package_table = create_package_hashtable(package_data)
+    route_cache.set_max_size(args.route_cache_size)
+    snapshot_path = None if args.no_snapshot else SNAPSHOT_PATH
+    typecode = "f" if args.float_distances else "d"
+    with instrumentation.time_phase("load"):
+        distance_table, package_table, malformed_distances, malformed_packages = load_tables(snapshot_path=snapshot_path, typecode=typecode, matrix_path=args.distance_file,
+                                                                                             shortest_paths=args.shortest_paths)
+    
+    print_malformed_rows("distances.csv", malformed_distances)
+    print_malformed_rows("packages.csv", malformed_packages)
+    
+    # The speed profile and speed classes aren't part of the snapshot, so
+    # they're read every time the program starts
+    if args.speed_profile is not None:
+        distance_table.set_speed_profile(load_speed_profile(args.speed_profile))
+        if args.speed_classes is not None:
+            print_malformed_rows(args.speed_classes, load_speed_classes(args.speed_classes, distance_table))
+    
+    # In sweep mode, every combination of the scenario settings is evaluated
+    # and the results are printed instead of running the main loop
+    if args.sweep:
+        scenarios = create_scenario_grid(args.sweep_speeds or [TRUCK_SPEED], args.sweep_starts, args.sweep_trucks or [args.trucks],
+                                         args.sweep_drivers or [args.drivers], args.sweep_capacities or [args.capacity])
+        print_scenario_results(run_scenario_sweep(package_table, distance_table, scenarios, args.workers))
+        return
+        
+    # The routes don't depend on the time, so they are only planned once. If
+    # the packages can't be delivered with the trucks and drivers provided,
+    # the reason is printed instead of a traceback
+    try:
+        with instrumentation.time_phase("route"):
+            day_timeline = create_day_timeline(package_table, distance_table, args.improve_routes, args.trucks, args.drivers, args.capacity)
+    except ValueError as error:
+        sys.exit(f"Couldn't plan the day: {error}")
 
+    # In export mode, the simulation is run once for all of the requested
+    # times and the results are written out instead of running the main loop
+    if args.export:
+        times = [max(time_to_minutes(export_time)/60 - 8, 0) for export_time in args.export_time.split(",") if export_time.strip()]
+        replay = run_replay(package_table, distance_table, times, day_timeline)
+        
+        with instrumentation.time_phase("export"), contextlib.ExitStack() as stack:
+            output = sys.stdout
+            if args.export_path is not None:
+                output = stack.enter_context(open(args.export_path, "w", newline="", buffering=1 << 20))
+                
+            export_simulation_results(package_table, replay, output, args.export, args.export_filter)
+        return
+        
+    # In server mode, the planned day is shared by every query until the
+    # program is stopped
+    if args.serve:
+        with contextlib.suppress(KeyboardInterrupt):
+            asyncio.run(StatusServer(package_table, day_timeline, args.host, args.port).serve_forever())
+        return
+        
     # This is the main program loop. The program will continually ask the
     # user to enter a time and package id, then it will run a simulation. 
     # Finally, it will print the results of the simulation and restart the loop
     while True:
-        hours_passed, chosen_pkg = get_simulation_input()
+        hours_passed, chosen_pkg = get_simulation_input(package_table)
         print("-"*25)
-        results = run_simulation(package_table, distance_table, hours_passed)
-        print_simulation_results(package_table, hours_passed, chosen_pkg, results)
+        snapshot = run_simulation(package_table, distance_table, hours_passed, day_timeline)
+        with instrumentation.time_phase("print"):
+            print_simulation_results(package_table, chosen_pkg, snapshot, distance_table)
         print("-"*25)
         
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+# The tests import main.py directly, so the folder above this one is added to
+# the module search path before any of them run
+
+import os
+import sys
+
+import pytest
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DATA_DIR)
+
+import main
+
+# This fixture loads the real distances.csv and packages.csv files, without
+# reading or writing a snapshot, and returns the distance and package tables
+@pytest.fixture
+def tables():
+    distances_path = os.path.join(DATA_DIR, "distances.csv")
+    packages_path = os.path.join(DATA_DIR, "packages.csv")
+    distance_table, package_table, _, _ = main.load_tables(distances_path, packages_path, None)
+    return distance_table, package_table
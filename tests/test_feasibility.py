@@ -0,0 +1,86 @@
+# These tests check that Simulator.find_late_package agrees with the delivery
+# times a TruckTimeline gives the same route, with and without a SpeedProfile,
+# and that routes that depend on the speed are cached separately for each speed
+
+import random
+
+import pytest
+
+import main
+
+# This function returns the IDs of the packages that the TruckTimeline for the
+# route delivers late, in the order they're delivered
+def get_late_packages(package_table, distance_table, pkg_route, departure_time, speed):
+    hub_id = distance_table.get_hub_id()
+    address_ids = [hub_id] + [package_table.get_val(pkg_id).address_id for pkg_id in pkg_route] + [hub_id]
+    distance_list = [distance_table.get_distance(address_ids[index], address_ids[index + 1]) for index in range(len(address_ids) - 1)]
+    leg_classes = main.get_leg_classes(package_table, distance_table, pkg_route)
+    trip = main.TruckTimeline("Truck A", pkg_route, distance_list, departure_time, speed=speed, speed_profile=distance_table.speed_profile,
+                              leg_classes=leg_classes)
+    
+    return [pkg_id for pkg_id, delivery_time in zip(pkg_route, trip.delivery_times) if delivery_time > package_table.get_val(pkg_id).get_deadline()]
+    
+def set_rush_hour(distance_table, rng):
+    distance_table.set_speed_profile(main.SpeedProfile([[0.5, 1, 0.7, 1], [0.3, 0.8, 0.5, 1]], 0.75, 0))
+    for _ in range(40):
+        distance_table.set_speed_class(rng.randrange(distance_table.num_addresses), rng.randrange(distance_table.num_addresses), 1)
+        
+@pytest.mark.parametrize("use_profile", [False, True])
+@pytest.mark.parametrize("ordered", [False, True])
+def test_find_late_package_matches_truck_timeline(tables, use_profile, ordered):
+    distance_table, package_table = tables
+    rng = random.Random(11)
+    if use_profile:
+        set_rush_hour(distance_table, rng)
+        
+    pkg_ids = sorted(package_table.keys())
+    num_late = 0
+    for _ in range(200):
+        speed = rng.choice([12, 18, 30])
+        simulator = main.Simulator(speed, main.RouteCache())
+        package_list = rng.sample(pkg_ids, rng.randint(1, 16))
+        departure_time = rng.choice([0, 0.5, 1.05, 2])
+        
+        if ordered:
+            pkg_route = package_list
+        else:
+            pkg_route, _ = simulator.get_delivery_route(package_table, distance_table, package_list, departure_time)
+            
+        # A package that can't make its deadline at all can be reported before
+        # the first late one on the route, but it still has to be late
+        late_package = simulator.find_late_package(package_table, distance_table, package_list, departure_time, ordered)
+        late_packages = get_late_packages(package_table, distance_table, pkg_route, departure_time, speed)
+        assert (late_package is None) == (not late_packages)
+        assert late_package is None or late_package in late_packages
+        num_late += late_package is not None
+        
+    # Both outcomes need to be checked for the test to mean anything
+    assert 0 < num_late < 200
+    
+def test_shorter_path_through_another_address_is_on_time(tables):
+    distance_table, package_table = tables
+    simulator = main.Simulator(main.TRUCK_SPEED, main.RouteCache())
+    
+    # Package 18's address is 11 miles straight from the hub, which can't be
+    # driven in the half hour before the end of the day, but it's only 7 miles
+    # going through package 23's address first
+    hub_id = distance_table.get_hub_id()
+    departure_time = main.END_OF_DAY - 0.5
+    assert distance_table.get_distance(hub_id, package_table.get_val(18).address_id)/main.TRUCK_SPEED > 0.5
+    assert get_late_packages(package_table, distance_table, [23, 18], departure_time, main.TRUCK_SPEED) == []
+    assert simulator.find_late_package(package_table, distance_table, [23, 18], departure_time, True) is None
+    
+def test_cached_routes_depend_on_speed(tables):
+    distance_table, package_table = tables
+    set_rush_hour(distance_table, random.Random(3))
+    route_cache = main.RouteCache()
+    pkg_ids = sorted(package_table.keys())
+    
+    # Each speed's routes are planned once with a shared cache and once with a
+    # cache of their own, and they have to come out the same
+    for speed in (12, 18, 30, 12):
+        shared = main.Simulator(speed, route_cache)
+        separate = main.Simulator(speed, main.RouteCache())
+        for start in range(0, len(pkg_ids), 8):
+            package_list = pkg_ids[start:start + 8]
+            assert shared.get_delivery_route(package_table, distance_table, package_list, 0.5) == separate.get_delivery_route(package_table, distance_table, package_list, 0.5)
@@ -0,0 +1,94 @@
+# These tests check the HashTable against a dict through long random runs of
+# inserts, bulk inserts, and deletes, which exercises probing, backward shift
+# deletion, and growing and shrinking the table
+
+import pickle
+import random
+
+import pytest
+
+import main
+
+# This function checks that a HashTable holds exactly the items in a dict
+def assert_same_items(table, expected):
+    assert len(table) == len(expected)
+    assert dict(table.items()) == expected
+    for key, value in expected.items():
+        assert table.has_key(key)
+        assert table.get_val(key) == value
+
+def test_random_operations_match_dict():
+    rng = random.Random(0)
+    table = main.HashTable(1)
+    expected = {}
+
+    for step in range(20000):
+        # A small key range means keys are reused, deleted, and collide often
+        key = rng.randrange(500)
+        action = rng.random()
+        if action < 0.5:
+            table.insert_val(key, step)
+            expected[key] = step
+        elif action < 0.55:
+            pairs = [(rng.randrange(500), step) for _ in range(rng.randrange(20))]
+            table.bulk_insert(pairs)
+            expected.update(pairs)
+        elif key in expected:
+            table.delete_val(key)
+            del expected[key]
+        else:
+            assert not table.has_key(key)
+
+        if step % 1000 == 0:
+            assert_same_items(table, expected)
+
+    assert_same_items(table, expected)
+
+def test_colliding_keys_survive_deletes():
+    # Every one of these keys has the same home slot in a table of 64 slots,
+    # so each delete has to shift the rest of the run back
+    table = main.HashTable(32)
+    keys = [index*table.size for index in range(20)]
+    for key in keys:
+        table.insert_val(key, -key)
+
+    rng = random.Random(1)
+    rng.shuffle(keys)
+    for count, key in enumerate(keys, 1):
+        table.delete_val(key)
+        assert_same_items(table, {other: -other for other in keys[count:]})
+
+def test_missing_key_raises():
+    table = main.HashTable(4)
+    table.insert_val("a", 1)
+
+    with pytest.raises(KeyError):
+        table.get_val("b")
+    with pytest.raises(KeyError):
+        table.delete_val("b")
+
+def test_none_can_be_a_key():
+    table = main.HashTable(4)
+    table.insert_val(None, "value")
+
+    assert table.has_key(None)
+    assert table.get_val(None) == "value"
+
+def test_shrinks_after_deletes():
+    table = main.HashTable(1)
+    for key in range(1000):
+        table.insert_val(key, key)
+    grown_size = table.size
+
+    for key in range(990):
+        table.delete_val(key)
+
+    assert table.size < grown_size
+    assert_same_items(table, {key: key for key in range(990, 1000)})
+
+def test_pickle_round_trip():
+    table = main.HashTable(8)
+    table.bulk_insert((key, str(key)) for key in range(100))
+
+    copy = pickle.loads(pickle.dumps(table))
+    assert_same_items(copy, {key: str(key) for key in range(100)})
@@ -0,0 +1,17 @@
+# These tests check that instrumentation can be turned on and off repeatedly
+
+import main
+
+def test_report_is_registered_at_exit_once(monkeypatch, tmp_path):
+    registered = []
+    monkeypatch.setattr(main.atexit, "register", registered.append)
+    instrumentation = main.Instrumentation()
+
+    try:
+        for _ in range(3):
+            instrumentation.enable(tmp_path/"report.json")
+            instrumentation.disable()
+    finally:
+        instrumentation.disable()
+
+    assert registered == [instrumentation.dump]
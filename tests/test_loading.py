@@ -0,0 +1,129 @@
+# These tests check that the csv loaders report every row or cell they can't
+# use instead of quietly filling the tables with bad values, and that a snapshot
+# gives back the same tables that were parsed
+
+import json
+import os
+import pickle
+
+import pytest
+
+import main
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ADDRESSES = ["HUB", "1 First St", "2 Second St"]
+
+def create_distances(rows):
+    malformed_rows = []
+    distance_table = main.create_distance_hashtable([[""] + ADDRESSES] + rows, malformed_rows)
+    return distance_table, malformed_rows
+
+def create_packages(rows, distance_table):
+    malformed_rows = []
+    package_table = main.create_package_hashtable(rows, distance_table, malformed_rows)
+    return package_table, malformed_rows
+
+def test_complete_distances_load_cleanly():
+    distance_table, malformed_rows = create_distances([
+        ["HUB", "0", "", ""],
+        ["1 First St", "1.5", "0", ""],
+        ["2 Second St", "2", "3.5", "0"],
+    ])
+    assert malformed_rows == []
+    assert distance_table.get_distance(2, 1) == distance_table.get_distance(1, 2) == 3.5
+    
+def test_empty_lower_cells_are_malformed():
+    _, malformed_rows = create_distances([
+        ["HUB", "0", "", ""],
+        ["1 First St", "", "0", ""],
+        ["2 Second St", "2", "3.5", ""],
+    ])
+    assert malformed_rows == [(2, "missing the distance to 'HUB'"), (3, "missing the distance to '2 Second St'")]
+    
+def test_truncated_rows_are_malformed():
+    _, malformed_rows = create_distances([
+        ["HUB", "0"],
+        ["1 First St", "1.5", "0"],
+        ["2 Second St", "2"],
+    ])
+    assert malformed_rows == [(3, "expected 3 distances but found 1")]
+    
+def test_missing_rows_are_malformed():
+    _, malformed_rows = create_distances([
+        ["HUB", "0", "", ""],
+    ])
+    assert malformed_rows == [(2, "missing the row for '1 First St'"), (3, "missing the row for '2 Second St'")]
+    
+def test_duplicate_package_ids_keep_the_first_row():
+    distance_table, _ = create_distances([
+        ["HUB", "0", "", ""],
+        ["1 First St", "1.5", "0", ""],
+        ["2 Second St", "2", "3.5", "0"],
+    ])
+    package_table, malformed_rows = create_packages([
+        ["1", "1 First St", "City", "UT", "84115", "EOD", "5", "BOD"],
+        ["2", "2 Second St", "City", "UT", "84115", "EOD", "5", "BOD"],
+        ["1", "2 Second St", "City", "UT", "84115", "EOD", "5", "BOD"],
+    ], distance_table)
+    assert malformed_rows == [(3, "package 1 is already listed on row 1")]
+    assert len(package_table) == 2
+    assert package_table.get_val(1).address == "1 First St"
+    
+def test_snapshot_holds_the_same_tables(tmp_path):
+    distances_path = os.path.join(DATA_DIR, "distances.csv")
+    packages_path = os.path.join(DATA_DIR, "packages.csv")
+    snapshot_path = tmp_path/"tables.snapshot"
+    parsed = main.load_tables(distances_path, packages_path, snapshot_path)
+    loaded = main.load_snapshot(snapshot_path, [distances_path, packages_path])
+    
+    assert loaded is not None
+    assert list(loaded[0].matrix) == list(parsed[0].matrix)
+    assert sorted(package.get_row() for package in loaded[1].values()) == sorted(package.get_row() for package in parsed[1].values())
+    assert loaded[2:] == parsed[2:]
+    
+def test_snapshot_metadata_is_json(tmp_path):
+    distances_path = os.path.join(DATA_DIR, "distances.csv")
+    packages_path = os.path.join(DATA_DIR, "packages.csv")
+    snapshot_path = tmp_path/"tables.snapshot"
+    main.load_tables(distances_path, packages_path, snapshot_path)
+    
+    with open(snapshot_path, "rb") as f:
+        _, metadata_length, _ = main.SNAPSHOT_HEADER.unpack(f.read(main.SNAPSHOT_HEADER.size))
+        metadata = json.loads(f.read(metadata_length))
+        
+    assert metadata["addresses"][0] == "HUB"
+    assert len(metadata["package_rows"]) == 40
+    
+@pytest.mark.parametrize("metadata", [pickle.dumps(main.Package), b"[1, 2", b"[]", b'{"sources": 5}'])
+def test_tampered_snapshot_is_ignored(tmp_path, metadata):
+    distances_path = os.path.join(DATA_DIR, "distances.csv")
+    packages_path = os.path.join(DATA_DIR, "packages.csv")
+    snapshot_path = tmp_path/"tables.snapshot"
+    with open(snapshot_path, "wb") as f:
+        f.write(main.SNAPSHOT_HEADER.pack(main.SNAPSHOT_MAGIC, len(metadata), main.SNAPSHOT_HEADER.size + len(metadata)))
+        f.write(metadata)
+        
+    assert main.load_snapshot(snapshot_path, [distances_path, packages_path]) is None
+    assert len(main.load_tables(distances_path, packages_path, snapshot_path)[1]) == 40
+    
+def test_snapshot_distances_are_written_to_matrix_path(tmp_path):
+    distances_path = os.path.join(DATA_DIR, "distances.csv")
+    packages_path = os.path.join(DATA_DIR, "packages.csv")
+    snapshot_path = tmp_path/"tables.snapshot"
+    parsed = main.load_tables(distances_path, packages_path, snapshot_path)
+    
+    matrix_path = tmp_path/"distances.bin"
+    distance_table = main.load_tables(distances_path, packages_path, snapshot_path, matrix_path=matrix_path)[0]
+    size = len(parsed[0].matrix)
+    
+    assert list(main.open_matrix(matrix_path, size)) == list(parsed[0].matrix)
+    assert list(distance_table.matrix) == list(parsed[0].matrix)
+    
+def test_loading_distances_changes_the_version_once():
+    first_stamp = next(main.VERSION_STAMPS)
+    distance_table = main.create_distance_hashtable(main.load_distance_data(os.path.join(DATA_DIR, "distances.csv")))
+    
+    # The address hash table and the new DistanceTable take a few stamps of
+    # their own, but the distances themselves only take one
+    assert distance_table.version - first_stamp < 10 < distance_table.num_addresses
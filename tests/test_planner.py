@@ -0,0 +1,69 @@
+# These tests check that the LoadPlanner splits the packages into loads that
+# cover every package once and fit on the trucks, on synthetic data files
+
+import random
+
+import pytest
+
+import benchmark
+import main
+
+# This fixture writes synthetic data files with 2000 packages sent to 300
+# addresses and returns the loaded distance and package tables
+@pytest.fixture
+def synthetic_tables(tmp_path):
+    rng = random.Random(7)
+    distances_path = tmp_path/"distances.csv"
+    packages_path = tmp_path/"packages.csv"
+    addresses = benchmark.generate_distance_csv(distances_path, 300, rng)
+    benchmark.generate_package_csv(packages_path, 2000, addresses, rng)
+    distance_table, package_table, _, _ = main.load_tables(distances_path, packages_path, None)
+    return distance_table, package_table
+
+@pytest.mark.parametrize("capacity", [4, 16, 60])
+def test_loads_cover_every_package_once(synthetic_tables, capacity):
+    distance_table, package_table = synthetic_tables
+    loads = main.LoadPlanner(10, 10, capacity).create_loads(package_table, distance_table)
+
+    pkg_ids = [pkg_id for load in loads for pkg_id in load.pkg_ids]
+    assert sorted(pkg_ids) == sorted(package_table)
+    assert all(len(load.pkg_ids) <= capacity for load in loads)
+
+def test_day_plan_delivers_every_package(synthetic_tables):
+    distance_table, package_table = synthetic_tables
+    day_timeline = main.create_day_timeline(package_table, distance_table, None, 20, 20)
+
+    assert day_timeline.num_packages == len(package_table)
+    assert set(day_timeline.get_snapshot(48).statuses) == {2}
+
+def test_infeasible_settings_raise_value_error(tables):
+    distance_table, package_table = tables
+
+    with pytest.raises(ValueError):
+        main.create_day_timeline(package_table, distance_table, None, 1, 1, 4)
+
+def test_improved_loads_beat_the_hand_built_loads(tables):
+    distance_table, package_table = tables
+    simulator = main.Simulator(main.TRUCK_SPEED, main.RouteCache())
+    day_timeline = main.LoadPlanner(main.NUM_TRUCKS, main.NUM_DRIVERS, main.TRUCK_CAPACITY, search_time=10).plan_day(package_table, distance_table, simulator)
+
+    # The loads that were written out by hand drove 88 miles
+    assert day_timeline.get_total_miles() <= 88
+    assert day_timeline.count_late_packages(package_table) == 0
+
+def test_improved_loads_are_never_worse(synthetic_tables):
+    distance_table, package_table = synthetic_tables
+    load_planner = main.LoadPlanner(20, 20, 16)
+    simulator = main.Simulator(main.TRUCK_SPEED, main.RouteCache())
+    loads = load_planner.create_loads(package_table, distance_table)
+    before = main.DayTimeline(load_planner.schedule_loads(loads, package_table, distance_table, simulator))
+    improved_loads = load_planner.improve_loads(loads, package_table, distance_table, simulator, 0.5)
+    after = main.DayTimeline(load_planner.schedule_loads(improved_loads, package_table, distance_table, simulator))
+
+    pkg_ids = [pkg_id for load in improved_loads for pkg_id in load.pkg_ids]
+    assert sorted(pkg_ids) == sorted(package_table)
+    assert all(len(load.pkg_ids) <= 16 for load in improved_loads)
+    assert after.get_total_miles() <= before.get_total_miles()
+    assert after.count_late_packages(package_table) <= before.count_late_packages(package_table)
+    for trip in after.truck_timelines:
+        assert all(package_table.get_val(pkg_id).get_required_truck() in (None, trip.truck_index) for pkg_id in trip.pkg_route)
@@ -0,0 +1,118 @@
+# These tests check that the RouteRepairer changes a planned day using each
+# trip's own speed and each truck's own capacity, and that the trips it changes
+# or adds still fit together
+
+import pytest
+
+import main
+
+def create_package(distance_table, pkg_id, address, deadline="EOD"):
+    return main.Package(pkg_id, address, "Salt Lake City", "UT", "84104", deadline, "5", "BOD", "", distance_table.get_address_id(address))
+
+def test_insertion_uses_the_trip_speed(tables):
+    distance_table, package_table = tables
+    hub_id = distance_table.get_hub_id()
+    address_id = package_table.get_val(2).address_id
+    distance = distance_table.get_distance(hub_id, address_id)
+    trip = main.TruckTimeline("Truck A", [2], [distance, distance], 0, speed=36, truck_index=0)
+    
+    # 1060 Dalton Ave S is 7.2 miles from the hub, so a truck going 36 mph
+    # gets there at 8:12AM, while one going 18 mph wouldn't until 8:24AM
+    package = create_package(distance_table, 100, "1060 Dalton Ave S", "8:20 AM")
+    insertion = main.RouteRepairer().find_cheapest_insertion(trip, 0, package, package_table, distance_table)
+    assert insertion[0] == 0 and insertion[2] == 0
+    
+def test_added_package_goes_to_a_truck_with_room(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    routes = [list(trip.pkg_route) for trip in day_timeline.truck_timelines]
+    
+    # Every truck is full except the one that carries the first trip
+    open_truck = day_timeline.truck_timelines[0].truck_index
+    capacities = [0]*main.NUM_TRUCKS
+    capacities[open_truck] = max(len(trip.pkg_route) for trip in day_timeline.truck_timelines) + 1
+    
+    package = create_package(distance_table, 100, "1060 Dalton Ave S")
+    new_timeline = main.RouteRepairer(capacities).add_package(day_timeline, package_table, distance_table, package, 0)
+    trip, _ = new_timeline.get_package_position(100)
+    
+    assert trip.truck_index == open_truck
+    assert len(trip.pkg_route) <= capacities[open_truck]
+    assert package_table.get_val(100) is package
+    assert [list(trip.pkg_route) for trip in day_timeline.truck_timelines] == routes
+    
+# This function checks that every trip's distances and departure still match
+# its route and the trips it follows
+def check_day(day_timeline, package_table, distance_table):
+    hub_id = distance_table.get_hub_id()
+    for trip in day_timeline.truck_timelines:
+        address_ids = [hub_id] + [package_table.get_val(pkg_id).address_id for pkg_id in trip.pkg_route] + [hub_id]
+        assert trip.distance_list == [distance_table.get_distance(address_ids[index], address_ids[index + 1]) for index in range(len(address_ids) - 1)]
+        if trip.follows:
+            assert trip.departure_time == max([trip.ready_time] + [previous.end_time for previous in trip.follows])
+            assert all(any(previous is other for other in day_timeline.truck_timelines) for previous in trip.follows)
+            
+def test_package_without_room_gets_a_new_trip(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    num_trips = len(day_timeline.truck_timelines)
+    
+    # By 11:00AM every planned trip has already left the hub
+    assert all(trip.departure_time < 3 for trip in day_timeline.truck_timelines)
+    package = create_package(distance_table, 41, "1060 Dalton Ave S")
+    package.arrival_time, package.arrival_minutes = "11:00 AM", 180
+    new_timeline = main.RouteRepairer().add_package(day_timeline, package_table, distance_table, package, 3)
+    trip, _ = new_timeline.get_package_position(41)
+    
+    assert len(new_timeline.truck_timelines) == num_trips + 1 and trip.pkg_route == [41]
+    assert trip.departure_time >= 3
+    assert package.get_status(new_timeline.get_snapshot(main.END_OF_DAY)).startswith("Delivered")
+    check_day(new_timeline, package_table, distance_table)
+    
+def test_package_with_no_free_truck_is_rejected(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    package = create_package(distance_table, 41, "1060 Dalton Ave S")
+    package.notes = "Can only be on truck 3"
+    
+    # Every trip has left by the end of the day, and truck 3 can't carry anything
+    with pytest.raises(ValueError):
+        main.RouteRepairer([main.TRUCK_CAPACITY, main.TRUCK_CAPACITY, 0]).add_package(day_timeline, package_table, distance_table, package, main.END_OF_DAY)
+    assert not package_table.has_key(41)
+    
+def test_change_address_moves_the_stop(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    trip, _ = day_timeline.get_package_position(9)
+    old_route = list(trip.pkg_route)
+    
+    new_timeline = main.RouteRepairer().change_address(day_timeline, package_table, distance_table, 9, "410 S State St", trip.departure_time, zipcode="84111")
+    new_trip, _ = new_timeline.get_package_position(9)
+    
+    assert package_table.get_val(9).address == "410 S State St" and package_table.get_val(9).zipcode == "84111"
+    assert package_table.get_val(9).address_id == distance_table.get_address_id("410 S State St")
+    assert sorted(new_trip.pkg_route) == sorted(old_route) and trip.pkg_route == old_route
+    check_day(new_timeline, package_table, distance_table)
+    
+def test_change_address_after_delivery_is_rejected(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    trip = day_timeline.truck_timelines[0]
+    
+    with pytest.raises(ValueError):
+        main.RouteRepairer().change_address(day_timeline, package_table, distance_table, trip.pkg_route[0], "410 S State St", trip.end_time)
+        
+def test_remove_package_moves_the_trips_after_it(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    
+    # The last stop on a trip that another trip follows is removed before the
+    # truck leaves, so the following trip can leave earlier
+    trip = next(trip for trip in day_timeline.truck_timelines if any(previous is trip for other in day_timeline.truck_timelines for previous in other.follows))
+    pkg_id = trip.pkg_route[-1]
+    new_timeline = main.RouteRepairer().remove_package(day_timeline, package_table, distance_table, pkg_id, trip.departure_time)
+    
+    assert not package_table.has_key(pkg_id) and not new_timeline.package_rows.has_key(pkg_id)
+    assert new_timeline.get_total_miles() <= day_timeline.get_total_miles()
+    assert len(new_timeline.get_package_position(trip.pkg_route[0])[0].pkg_route) == len(trip.pkg_route) - 1
+    check_day(new_timeline, package_table, distance_table)
@@ -0,0 +1,85 @@
+# These tests check that the StatusServer answers every request, including ones
+# with bad queries, and keeps connections open between requests
+
+import asyncio
+import json
+
+import pytest
+
+import main
+
+@pytest.fixture
+def server(tables):
+    distance_table, package_table = tables
+    return main.StatusServer(package_table, main.create_day_timeline(package_table, distance_table))
+    
+def post_batch(server, queries):
+    status_code, payload = server.handle_request("POST", "/batch", json.dumps(queries).encode())
+    assert status_code == 200
+    return payload["results"]
+    
+def test_bad_queries_only_fail_themselves(server):
+    results = post_batch(server, [
+        {"package": 1, "time": 5},
+        {"package": 1e400, "time": "9:00 AM"},
+        {"package": [1], "time": "9:00 AM"},
+        {"package": True, "time": "9:00 AM"},
+        {"package": "one", "time": "9:00 AM"},
+        {"package": 1, "time": "25:00 AM"},
+        "not a query",
+        {"package": "1", "time": "9:00 AM"},
+        {"package": 1, "time": "9:00 AM"},
+    ])
+    
+    assert all("error" in result for result in results[:7])
+    assert results[7] == results[8]
+    assert results[8]["package"] == 1 and "error" not in results[8]
+    
+def test_bad_requests_get_a_response(server):
+    assert server.handle_request("POST", "/batch", b"{")[0] == 400
+    assert server.handle_request("POST", "/batch", b'{"package": 1}')[0] == 400
+    assert server.handle_request("GET", "/status?time=9:00AM&package=1.5", b"")[0] == 400
+    assert server.handle_request("GET", "/status?package=1", b"")[0] == 400
+    assert server.handle_request("POST", "/batch", b"[" * 100000)[0] == 500
+    assert server.handle_request("GET", "/batch", b"")[0] == 405
+    assert server.handle_request("GET", "/missing", b"")[0] == 404
+    
+# This function sends a request on an open connection and reads back the
+# status code, headers and JSON body of the response
+async def send_request(reader, writer, method, target, body=b"", headers=""):
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n{headers}\r\n".encode() + body)
+    await writer.drain()
+    
+    status_code = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode().partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+        
+    payload = json.loads(await reader.readexactly(int(response_headers["content-length"])))
+    return status_code, response_headers, payload
+    
+def test_connection_is_kept_alive_after_bad_requests(server):
+    async def run_client():
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = [
+                await send_request(reader, writer, "POST", "/batch", b'[{"package": 1, "time": 5}, {"package": 1e400, "time": "9:00 AM"}]'),
+                await send_request(reader, writer, "POST", "/batch", b"[" * 100000),
+                await send_request(reader, writer, "GET", "/status?time=9:00AM&package=1"),
+                await send_request(reader, writer, "GET", "/overview?time=9:00AM", headers="Connection: close\r\n"),
+            ]
+            closed = await reader.read() == b""
+            writer.close()
+            await writer.wait_closed()
+            return responses, closed
+            
+    responses, closed = asyncio.run(run_client())
+    
+    assert [status_code for status_code, _, _ in responses] == [200, 500, 200, 200]
+    assert [headers["connection"] for _, headers, _ in responses] == ["keep-alive", "keep-alive", "keep-alive", "close"]
+    assert all("error" in result for result in responses[0][2]["results"])
+    assert responses[2][2]["packages"][0]["package"] == 1
+    assert closed
@@ -0,0 +1,82 @@
+# These tests run the whole simulation on the real data files
+
+import io
+import json
+import os
+
+import main
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Times out of order and repeated, from before the first truck leaves until
+# after the last one is back
+REPLAY_TIMES = [3.25, 0, 10, 1.5, 0.75, 3.25, 5, 2, 14, 0.1]
+
+def test_run_simulation_without_timeline(tables):
+    distance_table, package_table = tables
+    snapshot = main.run_simulation(package_table, distance_table, 10)
+
+    assert len(snapshot.statuses) == len(package_table)
+    assert all(result.route_length > 0 for result in snapshot.results)
+
+def test_run_simulation_with_improved_routes(tables):
+    distance_table, package_table = tables
+    planned = main.run_simulation(package_table, distance_table, 24)
+    improved = main.run_simulation(package_table, distance_table, 24, improve_time=0.5)
+
+    assert sum(result.route_length for result in improved.results) <= sum(result.route_length for result in planned.results) + 1e-9
+
+def test_every_package_delivered_on_time(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    snapshot = day_timeline.get_snapshot(24)
+
+    assert set(snapshot.statuses) == {2}
+    assert day_timeline.count_late_packages(package_table) == 0
+
+def test_replay_matches_snapshots(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    replay = day_timeline.get_replay(REPLAY_TIMES)
+
+    for time_index, (hours_passed, replayed) in enumerate(zip(REPLAY_TIMES, replay.iter_snapshots())):
+        snapshot = day_timeline.get_snapshot(hours_passed)
+        assert replayed.statuses == snapshot.statuses
+        assert [vars(result) for result in replayed.results] == [vars(result) for result in snapshot.results]
+        for pkg_id in package_table:
+            assert replay.get_package_state(pkg_id, time_index) == snapshot.get_package_state(pkg_id)
+            assert replay.get_package_statuses(pkg_id)[time_index] == snapshot.get_package_state(pkg_id)[0]
+
+def test_export_matches_snapshots(tables):
+    distance_table, package_table = tables
+    day_timeline = main.create_day_timeline(package_table, distance_table)
+    output = io.StringIO()
+    main.export_simulation_results(package_table, day_timeline.get_replay(REPLAY_TIMES), output)
+
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    expected = []
+    for hours_passed in REPLAY_TIMES:
+        snapshot = day_timeline.get_snapshot(hours_passed)
+        string_time = main.float_to_time(hours_passed, 8)
+        expected.append({"record": "overview", **main.get_overview_record(snapshot.results, hours_passed)})
+        expected.extend({"record": "truck", "time": string_time, **main.get_trip_record(result)} for result in snapshot.results)
+        expected.extend({"record": "package", "time": string_time, **main.get_package_record(the_package, snapshot.get_package_state(pkg_id), hours_passed)}
+                        for pkg_id, the_package in sorted(package_table.items()))
+
+    assert records == json.loads(json.dumps(expected))
+
+def test_changed_distance_changes_the_route(tables):
+    distance_table, package_table = tables
+    package_list = [1, 2, 4, 5, 7, 8, 10, 11, 12, 17]
+    simulator = main.Simulator(main.TRUCK_SPEED)
+    simulator.calculate_delivery_route(package_table, distance_table, package_list)
+
+    # Moving package 12's address right next to the hub has to be seen by a
+    # table whose neighbor lists were already built, the same as a new one
+    fresh_distance_table = main.create_distance_hashtable(main.load_distance_data(os.path.join(DATA_DIR, "distances.csv")))
+    for table in (distance_table, fresh_distance_table):
+        table.set_distance(table.get_hub_id(), package_table.get_val(12).address_id, 0.5)
+
+    route = simulator.calculate_delivery_route(package_table, distance_table, package_list)
+    assert route == simulator.calculate_delivery_route(package_table, fresh_distance_table, package_list)
+    assert route[0][0] == 12
@@ -0,0 +1,42 @@
+# These tests run a small scenario sweep on the real data files and compare it
+# with the same scenarios evaluated one at a time
+
+from multiprocessing import shared_memory
+
+import pytest
+
+import main
+
+SCENARIOS = [main.Scenario(main.TRUCK_SPEED, 0, 3, 2, 16), main.Scenario(25, 1, 2, 2, 20)]
+
+# This fixture records the name of every shared memory block the sweep creates
+@pytest.fixture
+def shared_names(monkeypatch):
+    names = []
+    
+    class RecordedSharedMemory(shared_memory.SharedMemory):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            if kwargs.get("create"):
+                names.append(self.name)
+                
+    monkeypatch.setattr(main.shared_memory, "SharedMemory", RecordedSharedMemory)
+    return names
+
+def test_sweep_matches_serial_run(tables, shared_names):
+    distance_table, package_table = tables
+    results = main.run_scenario_sweep(package_table, distance_table, SCENARIOS, 2)
+    expected = [main.evaluate_scenario(package_table, distance_table, scenario) for scenario in SCENARIOS]
+
+    assert [result.scenario.speed for result in results] == [scenario.speed for scenario in SCENARIOS]
+    for result, serial in zip(results, expected):
+        assert result.error is None and serial.error is None
+        assert (result.total_miles, result.num_late, result.time_completed) == (serial.total_miles, serial.num_late, serial.time_completed)
+
+def test_sweep_unlinks_shared_memory(tables, shared_names):
+    distance_table, package_table = tables
+    main.run_scenario_sweep(package_table, distance_table, SCENARIOS, 2)
+
+    assert len(shared_names) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shared_names[0])
@@ -0,0 +1,29 @@
+# These tests check that times are parsed and formatted without losing a minute
+# to rounding
+
+import pytest
+
+import main
+
+def test_every_minute_round_trips():
+    for minutes in range(24*60):
+        string_time = main.float_to_time(minutes/60, 0)
+        assert main.time_to_minutes(string_time) == minutes
+
+def test_package_times_format_exactly(tables):
+    _, package_table = tables
+    for package in package_table.values():
+        assert main.time_to_minutes(main.float_to_time(package.get_arrival_time(), 8)) == package.arrival_minutes + 8*60
+        if package.deadline != "EOD":
+            assert main.float_to_time(package.get_deadline(), 8) == main.float_to_time(package.deadline_minutes/60, 8)
+
+def test_float_to_time_examples():
+    assert main.float_to_time(65/60, 8) == "09:05AM"
+    assert main.float_to_time(2.5, 8) == "10:30AM"
+    assert main.float_to_time(4, 8) == "12:00PM"
+    assert main.float_to_time(16, 8) == "12:00AM"
+
+@pytest.mark.parametrize("string_time", ["13:00 PM", "9:5 AM", "9:05", "noon"])
+def test_bad_times_are_rejected(string_time):
+    with pytest.raises(ValueError):
+        main.time_to_minutes(string_time)